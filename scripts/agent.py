@@ -6,21 +6,31 @@ from agent_utils.actions import perform_action
 from agent_utils.reward_memory import update_reward_table, save_rewards, load_rewards
 from agent_utils.reward_memory import reward_table
 from agent_utils.state_extractor import get_game_state
-from agent_utils.screen_capture import get_window_region, capture_screen
+from agent_utils.screen_capture import get_window_region, capture_frame, CANONICAL_FRAMES
 from hud_monitor import HUDMonitor
 from agent_utils.hud_analyser import HUDAnalyser
 from agent_utils.reward_model import calculate_reward
 from agent_utils.screen_monitor import is_special_screen
+from agent_utils.frame_watcher import wait_for_frame_change
+from agent_utils.snapshot import Snapshotter, capture_state, restore_state, load_latest_snapshot
+from agent_utils.event_log import EventLog, HUD_SLOTS
+from agent_utils.reward_sweep import TransitionLog, TRANSITION_LOG
+from agent_utils.contextual_policy import context_features
+from agent_utils.motion import MotionEstimator, MOTION_EPSILON
 from agent_utils.actions import bring_nestopia_to_front
 
 
-def run_agent(episodes=500, delay=0.0, window_title="Nestopia"):
+SNAPSHOT_EVERY = int(os.getenv("SNAPSHOT_EVERY", "5"))  # 0 disables snapshots
+
+
+def run_agent(episodes=500, delay=0.0, window_title="Nestopia", resume=False):
     load_rewards()
 
     # track consecutive zero-motion failures to blacklist ineffective actions
     failure_counts = {}
     BLACKLIST_THRESHOLD = 3
     blacklisted_actions = set()
+    agent_state = {"failure_counts": failure_counts, "blacklisted_actions": blacklisted_actions}
 
     try:
         region = get_window_region(window_title)
@@ -37,48 +47,111 @@ def run_agent(episodes=500, delay=0.0, window_title="Nestopia"):
     hud_analyser = HUDAnalyser()
     os.makedirs("logs", exist_ok=True)
 
-    for ep in range(episodes):
-        img = capture_screen(region)
+    start_ep = 0
+    if resume:
+        snapshot = load_latest_snapshot()
+        if snapshot is None:
+            logging.warning("No snapshot found, starting from scratch")
+        else:
+            restore_state(snapshot, agent_state, hud_analyser)
+            start_ep = snapshot["episode"] + 1
+            logging.info("Resumed from episode %d (epsilon %.2f)", snapshot["episode"], policy.epsilon)
+    snapshotter = Snapshotter()
+    # one HUD slot per calibrated field so the log never truncates HUD values
+    hud_slots = hud_monitor.field_count(frame=capture_frame(region) if CANONICAL_FRAMES else None)
+    event_log = EventLog(hud_slots=hud_slots or HUD_SLOTS)
+    # optional raw transition log for offline reward-weight sweeps
+    transition_log = TransitionLog(TRANSITION_LOG) if TRANSITION_LOG else None
+    last_action = None
+    last_hud_text = ""
+    # samples frames between detections for scroll / player motion
+    motion = MotionEstimator()
+    motion.start(lambda: capture_frame(region))
+    # last raw get_game_state result; get_game_state hands back the same object
+    # when it reuses a cached detection (SKIP_N_FRAMES)
+    last_raw = None
+    # whether the estimator is anchored on the frame the reused state came from
+    anchored = False
+
+    for ep in range(start_ep, episodes):
+        # per-stage wall time in milliseconds, recorded in the event log
+        timings = {}
+        t0 = time.perf_counter()
+        img = capture_frame(region)
         while is_special_screen(img):
                 time.sleep(0.01)
-                img = capture_screen(region)
+                img = capture_frame(region)
 
         prev_img   = img
         screen_shape = prev_img.shape[:2]
-        prev_state = get_game_state(prev_img)
-        hud_before = hud_monitor.extract_hud_info()
+        t1 = time.perf_counter()
+        raw_prev = get_game_state(prev_img)
+        motion.feed(prev_img)
+        if raw_prev is not last_raw:
+            # fresh detection on prev_img: measure this step from here
+            motion.anchor(raw_prev.player_pos, prev_img)
+            anchored = True
+        # otherwise raw_prev is the previous step's detection, anchored on its frame
+        prev_state = raw_prev.replace(level_progress=motion.level_progress)
+        t2 = time.perf_counter()
+        # canonical frames already contain the HUD, so no extra screenshot is needed
+        hud_before = hud_monitor.extract_hud_info(frame=prev_img if CANONICAL_FRAMES else None)
+        t3 = time.perf_counter()
+        timings["capture"] = (t1 - t0) * 1000
+        timings["detect"] = (t2 - t1) * 1000
+        timings["hud"] = (t3 - t2) * 1000
 
         # choose an action, skipping any blacklisted combos
-        action = policy.choose_action(ep=ep)
+        hud_text = hud_before.get("hud_text", "")
+        context = context_features(prev_state, screen_shape, last_hud_text, hud_text, last_action)
+        action = policy.choose_action(ep=ep, context=context, exclude=blacklisted_actions)
         while '+'.join(action) in blacklisted_actions:
             action = policy.choose_action(ep=ep)
 
         # Use a generic action duration from policy
         duration = policy.get_action_duration(action)
-        perform_action(action, duration)
+        t0 = time.perf_counter()
+        perform_action(action, duration, verbose=False)
 
         # Ensure the action has time to take effect and capture after update
         time.sleep(duration)
-        start_time = time.time()
-        next_img = capture_screen(region)
-        next_state = get_game_state(next_img)
-        # Poll until state changes or timeout
-        while next_state == prev_state and time.time() - start_time < duration + 0.1:
-            time.sleep(0.01)
-            next_img = capture_screen(region)
-            next_state = get_game_state(next_img)
-        # compute frame-to-frame player displacement
-        dx = next_state.get("player_x", 0) - prev_state.get("player_x", 0)
-        dy = next_state.get("player_y", 0) - prev_state.get("player_y", 0)
+        t1 = time.perf_counter()
+        # Wait on cheap frame differencing, then run the detector once
+        next_img, _ = wait_for_frame_change(
+            lambda: capture_frame(region), prev_img, timeout=duration + 0.1
+        )
+        t2 = time.perf_counter()
+        raw_next = get_game_state(next_img)
+        fresh_next = raw_next is not raw_prev
+        motion.feed(next_img)
+        next_state = raw_next.replace(level_progress=motion.level_progress)
+        t3 = time.perf_counter()
+        timings["action"] = (t1 - t0) * 1000
+        timings["capture"] += (t2 - t1) * 1000
+        timings["detect"] += (t3 - t2) * 1000
+        # player displacement including camera scroll; falls back to the
+        # motion estimator when the detector missed the player
+        dx, dy = motion.step_motion(
+            prev_state.player_pos if anchored else None,
+            next_state.player_pos if anchored and fresh_next else None,
+        )
+        # the next step usually reuses this detection: anchor on its frame now
+        if fresh_next:
+            motion.anchor(next_state.player_pos, next_img)
+        else:
+            motion.rebase()
+        anchored = fresh_next
+        last_raw = raw_next
         logging.debug("Movement dx=%s, dy=%s", dx, dy)
-        hud_after = hud_monitor.extract_hud_info()
+        hud_after = hud_monitor.extract_hud_info(frame=next_img if CANONICAL_FRAMES else None)
+        timings["hud"] += (time.perf_counter() - t3) * 1000
 
         # Update HUD analyser history
         hud_analyser.update(hud_before.get("hud_text", "").split())
         hud_analyser.update(hud_after.get("hud_text", "").split())
 
         action_key = '+'.join(action)
-        if dx == 0 and dy == 0:
+        if abs(dx) < MOTION_EPSILON and abs(dy) < MOTION_EPSILON:
             failure_counts[action_key] = failure_counts.get(action_key, 0) + 1
             if failure_counts[action_key] >= BLACKLIST_THRESHOLD:
                 blacklisted_actions.add(action_key)
@@ -86,18 +159,40 @@ def run_agent(episodes=500, delay=0.0, window_title="Nestopia"):
         else:
             failure_counts[action_key] = 0
 
-        reward = calculate_reward(prev_state, next_state, hud_before, hud_after, hud_analyser, screen_shape, dx, dy)
+        t0 = time.perf_counter()
+        components = {}
+        reward = calculate_reward(prev_state, next_state, hud_before, hud_after, hud_analyser, screen_shape, dx, dy,
+                                  components=components)
         update_reward_table('+'.join(action), reward)
+        policy.update_contextual(action, context, reward)
         policy.decay_epsilon()
+        last_action, last_hud_text = action, hud_text
+        timings["reward"] = (time.perf_counter() - t0) * 1000
+
+        if transition_log is not None:
+            weighted_hud_delta = hud_analyser.get_reward_delta(
+                hud_before.get("hud_text", "").split(), hud_after.get("hud_text", "").split()
+            )
+            transition_log.record(prev_state, next_state, hud_before, hud_after, weighted_hud_delta, screen_shape)
+        event_log.log_step(ep, action, reward, components, dx, dy, hud_after.get("hud_text", ""), timings)
 
-        logging.info("[EP %03d] Action: %s | Reward: %+0.2f | Epsilon: %.2f", ep, '+'.join(action), reward, policy.epsilon)
+        logging.debug("[EP %03d] Action: %s | Reward: %+0.2f | Epsilon: %.2f", ep, '+'.join(action), reward, policy.epsilon)
 
         if ep % 25 == 0:
             save_rewards()
+        if SNAPSHOT_EVERY and ep % SNAPSHOT_EVERY == 0:
+            snapshotter.submit(capture_state(ep, agent_state, hud_analyser))
 
         time.sleep(delay)
 
     save_rewards()
+    if SNAPSHOT_EVERY and episodes > start_ep:
+        snapshotter.submit(capture_state(episodes - 1, agent_state, hud_analyser))
+    motion.stop()
+    snapshotter.close()
+    event_log.close()
+    if transition_log is not None:
+        transition_log.close()
     # After training, display top 10 learned actions
     sorted_actions = sorted(reward_table.items(), key=lambda kv: kv[1], reverse=True)
     logging.info("\n[RESULT] Top 10 actions by average reward:")
@@ -44,6 +44,23 @@ def get_action_universe():
     """
     return _action_universe
 
+def get_state():
+    """Return a copy of the blacklist, failure counts and action universe."""
+    return {
+        "blacklist": set(_blacklist),
+        "failure_counts": dict(_failure_counts),
+        "action_universe": [list(a) for a in _action_universe],
+    }
+
+def set_state(state):
+    """Restore state previously returned by get_state()."""
+    global _action_universe
+    _blacklist.clear()
+    _blacklist.update(state["blacklist"])
+    _failure_counts.clear()
+    _failure_counts.update(state["failure_counts"])
+    _action_universe = [list(a) for a in state["action_universe"]]
+
 def stringify_key(key):
     return key.name if isinstance(key, Key) else str(key)
 
@@ -0,0 +1,101 @@
+# scripts/agent_utils/contextual_policy.py
+
+import numpy as np
+
+# Key order for the recent-action part of the context
+CONTEXT_KEYS = ("up", "down", "left", "right", "shift", "alt")
+# Horizontal distance to the nearest enemy, as a fraction of screen width
+ENEMY_BUCKETS = (0.1, 0.25)
+# bias + enemy buckets (none/near/mid/far) + player height + HUD up/down + recent keys
+CONTEXT_DIM = 1 + (len(ENEMY_BUCKETS) + 2) + 1 + 2 + len(CONTEXT_KEYS)
+
+
+def _hud_sum(hud_text):
+    return sum(int(t) for t in hud_text.split() if t.isdigit())
+
+
+def context_features(state, screen_shape, prev_hud_text, hud_text, last_action):
+    """
+    Compact context vector built from the detected GameState:
+    enemy distance bucket, normalized player height, HUD change direction and
+    the keys of the previous action.
+    """
+    x = np.zeros(CONTEXT_DIM)
+    x[0] = 1.0
+    height, width = screen_shape[:2]
+
+    player = state.player_pos
+    enemies = state.positions.get("enemy")
+    bucket = 0  # no player or no enemies
+    if player is not None and enemies is not None and len(enemies):
+        nearest = float(np.min(np.abs(enemies[:, 0] - player[0]))) / width
+        bucket = 1 + int(np.searchsorted(ENEMY_BUCKETS, nearest))
+    x[1 + bucket] = 1.0
+
+    offset = 2 + len(ENEMY_BUCKETS) + 1
+    if player is not None:
+        # 1.0 at the top of the screen, 0.0 at the bottom
+        x[offset] = 1.0 - player[1] / height
+    offset += 1
+
+    hud_delta = _hud_sum(hud_text) - _hud_sum(prev_hud_text)
+    x[offset] = float(hud_delta > 0)
+    x[offset + 1] = float(hud_delta < 0)
+    offset += 2
+
+    for k in last_action or ():
+        if k in CONTEXT_KEYS:
+            x[offset + CONTEXT_KEYS.index(k)] = 1.0
+    return x
+
+
+class LinUCB:
+    """
+    Disjoint LinUCB over action strings.
+    Per-arm inverse design matrices are kept stacked in one (K, d, d) array and
+    updated with Sherman-Morrison, so an update costs O(d^2) and scoring all
+    candidates is a single batched einsum. Arms are added lazily as the action
+    universe grows.
+    """
+
+    def __init__(self, dim=CONTEXT_DIM, alpha=1.0):
+        self.dim = dim
+        self.alpha = alpha
+        self.arms = {}
+        self.A_inv = np.empty((0, dim, dim))
+        self.b = np.empty((0, dim))
+
+    def _arm(self, key):
+        idx = self.arms.get(key)
+        if idx is None:
+            idx = len(self.arms)
+            self.arms[key] = idx
+            self.A_inv = np.concatenate([self.A_inv, np.eye(self.dim)[None]])
+            self.b = np.concatenate([self.b, np.zeros((1, self.dim))])
+        return idx
+
+    def select(self, candidates, x):
+        """Return the candidate (list of keys) with the highest upper confidence bound."""
+        idx = np.array([self._arm('+'.join(a)) for a in candidates])
+        A_inv = self.A_inv[idx]
+        theta = np.einsum('kij,kj->ki', A_inv, self.b[idx])
+        mean = theta @ x
+        var = np.einsum('i,kij,j->k', x, A_inv, x)
+        ucb = mean + self.alpha * np.sqrt(np.maximum(var, 0.0))
+        return candidates[int(np.argmax(ucb))]
+
+    def update(self, action, x, reward):
+        i = self._arm('+'.join(action))
+        A_inv = self.A_inv[i]
+        Ax = A_inv @ x
+        A_inv -= np.outer(Ax, Ax) / (1.0 + x @ Ax)
+        self.b[i] += reward * x
+
+    def get_state(self):
+        return {"arms": dict(self.arms), "A_inv": self.A_inv.copy(), "b": self.b.copy(), "alpha": self.alpha}
+
+    def set_state(self, state):
+        self.arms = dict(state["arms"])
+        self.A_inv = state["A_inv"].copy()
+        self.b = state["b"].copy()
+        self.alpha = state["alpha"]
@@ -0,0 +1,228 @@
+# scripts/agent_utils/detection_server.py
+
+import logging
+import os
+import queue
+import secrets
+import socket
+import threading
+import time
+from multiprocessing import resource_tracker
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+# Server address; the same variable switches state_extractor into client mode
+SOCKET_PATH = os.getenv("DETECTION_SERVER", "") or "/tmp/autoplayrl-detect.sock"
+# Shared secret for the connection handshake: DETECTION_AUTHKEY, or a 0600 key
+# file the server creates on first start
+AUTHKEY_PATH = os.getenv("DETECTION_AUTHKEY_FILE", os.path.expanduser("~/.autoplayrl/detect.key"))
+MAX_BATCH = int(os.getenv("DETECTION_MAX_BATCH", "8"))
+MAX_WAIT_MS = float(os.getenv("DETECTION_MAX_WAIT_MS", "5"))
+
+
+def load_authkey(path=AUTHKEY_PATH, create=False):
+    """
+    Return the connection authkey. Messages are pickled, so only processes
+    holding this key may talk to the server.
+    """
+    env = os.getenv("DETECTION_AUTHKEY")
+    if env:
+        return env.encode()
+    if create and not os.path.exists(path):
+        os.makedirs(os.path.dirname(path) or ".", mode=0o700, exist_ok=True)
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(secrets.token_hex(32))
+    try:
+        with open(path, "rb") as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        raise RuntimeError(f"No detection server key at {path}; start serve_detector.py first") from None
+
+
+def _claim_socket(address):
+    """Remove a stale socket file, refusing to take over one a live server is using."""
+    if not os.path.exists(address):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(address)
+    except (ConnectionRefusedError, FileNotFoundError):
+        os.remove(address)
+        return
+    finally:
+        probe.close()
+    raise RuntimeError(f"A detection server is already listening on {address}")
+
+
+class _Request:
+    __slots__ = ("image", "mapping", "conf", "iou", "tracker", "done", "result")
+
+    def __init__(self, image, mapping, conf, iou, tracker):
+        self.image = image
+        self.mapping = mapping
+        self.conf = conf
+        self.iou = iou
+        self.tracker = tracker
+        self.done = threading.Event()
+        self.result = None
+
+
+class DetectionServer:
+    """
+    Local inference server: loads the detector once and serves many agents.
+    Each client connection gets a handler thread that maps the client's
+    shared-memory frame slot and queues requests; the main loop collects up to
+    max_batch requests (waiting at most max_wait_ms after the first one) and
+    runs them through state_extractor.detect_batch together.
+    """
+
+    def __init__(self, address=SOCKET_PATH, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+        self.address = address
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._requests = queue.Queue()
+
+    def serve_forever(self):
+        from . import state_extractor
+        # load the configured detector up front; the tiny backend never needs best.pt
+        if state_extractor.DETECTOR_BACKEND == "tiny":
+            state_extractor.get_tiny_backend()
+        else:
+            state_extractor.get_model()
+        _claim_socket(self.address)
+        listener = Listener(self.address, family="AF_UNIX", authkey=load_authkey(create=True))
+        os.chmod(self.address, 0o600)
+        threading.Thread(target=self._accept, args=(listener,), name="detect-accept", daemon=True).start()
+        logging.info("Detection server listening on %s (max batch %d, max wait %.1f ms)",
+                     self.address, self.max_batch, self.max_wait * 1000)
+        try:
+            while True:
+                self._run_batch(state_extractor, self._collect())
+        finally:
+            listener.close()
+
+    def _collect(self):
+        batch = [self._requests.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run_batch(self, state_extractor, batch):
+        # detect_batch takes one mapping and threshold pair; group on them
+        groups = {}
+        for req in batch:
+            key = (repr(req.mapping), req.conf, req.iou)
+            groups.setdefault(key, []).append(req)
+        for reqs in groups.values():
+            first = reqs[0]
+            try:
+                states = state_extractor.detect_batch(
+                    [r.image for r in reqs], first.mapping, first.conf, first.iou,
+                    [r.tracker for r in reqs],
+                )
+            except Exception as e:
+                logging.error("Batched detection failed: %s", e)
+                states = [e] * len(reqs)
+            for req, state in zip(reqs, states):
+                req.result = state
+                req.done.set()
+
+    def _accept(self, listener):
+        while True:
+            try:
+                conn = listener.accept()
+            except (AuthenticationError, OSError) as e:
+                logging.warning("Rejected detection client: %s", e)
+                continue
+            threading.Thread(target=self._handle, args=(conn,), name="detect-client", daemon=True).start()
+
+    def _handle(self, conn):
+        from .game_state import CentroidTracker
+        tracker = CentroidTracker()
+        shm = None
+        try:
+            while True:
+                try:
+                    msg = conn.recv()
+                except EOFError:
+                    break
+                if shm is None or shm.name != msg["shm"]:
+                    if shm is not None:
+                        shm.close()
+                    shm = SharedMemory(name=msg["shm"])
+                    # the client owns the segment; keep our tracker from unlinking it
+                    try:
+                        resource_tracker.unregister(shm._name, "shared_memory")
+                    except Exception:
+                        pass
+                image = np.ndarray(msg["shape"], dtype=np.uint8, buffer=shm.buf)
+                req = _Request(image, msg["mapping"], msg["conf"], msg["iou"], tracker)
+                self._requests.put(req)
+                req.done.wait()
+                result = req.result
+                # drop views into the segment so it can be closed on resize
+                del image, req
+                conn.send(result)
+        finally:
+            if shm is not None:
+                shm.close()
+            conn.close()
+
+
+class DetectionClient:
+    """
+    Drop-in replacement for local detection: frames are copied into a
+    shared-memory slot owned by this client, and the GameState comes back over
+    the server's Unix socket.
+    """
+
+    def __init__(self, address=SOCKET_PATH):
+        self._conn = Client(address, family="AF_UNIX", authkey=load_authkey())
+        self._shm = None
+        self._slot = None
+
+    def _slot_for(self, image):
+        if self._shm is None or self._shm.size < image.nbytes:
+            self.close_slot()
+            self._shm = SharedMemory(create=True, size=image.nbytes)
+        if self._slot is None or self._slot.shape != image.shape:
+            self._slot = np.ndarray(image.shape, dtype=np.uint8, buffer=self._shm.buf)
+        return self._slot
+
+    def get_game_state(self, image, class_mapping=None, conf_thresh=None, iou_thresh=None):
+        from .state_extractor import CONF_THRESH, IOU_THRESH
+        slot = self._slot_for(image)
+        np.copyto(slot, image)
+        self._conn.send({
+            "shm": self._shm.name,
+            "shape": image.shape,
+            "mapping": class_mapping,
+            "conf": CONF_THRESH if conf_thresh is None else conf_thresh,
+            "iou": IOU_THRESH if iou_thresh is None else iou_thresh,
+        })
+        result = self._conn.recv()
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def close_slot(self):
+        if self._shm is not None:
+            self._slot = None
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def close(self):
+        self.close_slot()
+        self._conn.close()
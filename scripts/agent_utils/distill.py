@@ -0,0 +1,172 @@
+# scripts/agent_utils/distill.py
+
+import glob
+import logging
+import os
+import pickle
+import time
+
+import cv2
+import numpy as np
+import torch
+
+from .tiny_detector import TinyDetector, TINY_INPUT_SIZE, decode, detection_loss, encode_targets, to_input
+
+FRAMES_DIR = "data/frames"
+DATASET_PATH = "data/distill_dataset.pkl"
+TINY_MODEL_PATH = os.path.join(os.path.dirname(__file__), "../../models/tiny.pt")
+MATCH_RADIUS = 8.0  # native pixels for a student detection to count as the teacher's object
+BENCH_FRAMES = 50   # frames timed one at a time per model
+BENCH_WARMUP = 5
+
+
+def record_frames(region, out_dir=FRAMES_DIR, count=1000, interval=0.2):
+    """Save count canonical frames from the game window as PNGs, one every interval seconds."""
+    from .screen_capture import capture_frame
+    os.makedirs(out_dir, exist_ok=True)
+    start = len(glob.glob(os.path.join(out_dir, "*.png")))
+    for i in range(count):
+        frame = capture_frame(region)
+        cv2.imwrite(os.path.join(out_dir, f"frame_{start + i:06d}.png"), cv2.cvtColor(frame, cv2.COLOR_RGB2BGR))
+        time.sleep(interval)
+    logging.info("Recorded %d frames to %s", count, out_dir)
+
+
+def autolabel(frames_dir=FRAMES_DIR, out_path=DATASET_PATH, batch_size=16):
+    """
+    Label recorded frames with the YOLO teacher (best.pt + DEFAULT_CLASS_MAPPING).
+    Frames are resized to TINY_INPUT_SIZE and labels are object centers in those
+    pixels, grouped by state key.
+    """
+    from .state_extractor import DEFAULT_CLASS_MAPPING, detect_batch
+    classes = list(DEFAULT_CLASS_MAPPING)
+    paths = sorted(glob.glob(os.path.join(frames_dir, "*.png")))
+    w, h = TINY_INPUT_SIZE
+    frames = np.empty((len(paths), h, w, 3), dtype=np.uint8)
+    labels = []
+    for start in range(0, len(paths), batch_size):
+        batch = []
+        for j, path in enumerate(paths[start:start + batch_size]):
+            img = cv2.cvtColor(cv2.imread(path), cv2.COLOR_BGR2RGB)
+            frames[start + j] = cv2.resize(img, (w, h), interpolation=cv2.INTER_AREA)
+            batch.append(frames[start + j])
+        for state in detect_batch(batch, backend="yolo"):
+            labels.append({key: state.positions[key].copy() for key in classes})
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    with open(out_path, "wb") as f:
+        pickle.dump({"classes": classes, "frames": frames, "labels": labels}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    logging.info("Labelled %d frames into %s", len(paths), out_path)
+    return out_path
+
+
+def load_dataset(path=DATASET_PATH):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def _split(n, val_fraction, seed):
+    order = np.random.default_rng(seed).permutation(n)
+    n_val = max(1, int(n * val_fraction))
+    return order[n_val:], order[:n_val]
+
+
+def train(dataset, epochs=30, batch_size=32, lr=1e-3, width=32, val_fraction=0.1, seed=0, threads=None):
+    """
+    Train a TinyDetector on CPU against the teacher labels.
+    Returns (model, val_indices); the validation frames are never trained on.
+    """
+    torch.manual_seed(seed)
+    torch.set_num_threads(threads or os.cpu_count())
+    classes, frames, labels = dataset["classes"], dataset["frames"], dataset["labels"]
+    train_idx, val_idx = _split(len(frames), val_fraction, seed)
+    heat_t, off_t, mask_t = encode_targets(labels, classes)
+
+    model = TinyDetector(len(classes), width)
+    opt = torch.optim.Adam(model.parameters(), lr=lr)
+    sched = torch.optim.lr_scheduler.CosineAnnealingLR(opt, T_max=epochs)
+    for epoch in range(epochs):
+        model.train()
+        perm = np.random.permutation(train_idx)
+        total = 0.0
+        for start in range(0, len(perm), batch_size):
+            batch = perm[start:start + batch_size]
+            idx = torch.from_numpy(batch)
+            # frames stay uint8 in memory; only the batch is converted
+            heat, off = model(to_input(frames[batch]))
+            loss = detection_loss(heat, off, heat_t[idx], off_t[idx], mask_t[idx])
+            opt.zero_grad()
+            loss.backward()
+            opt.step()
+            total += loss.item() * len(idx)
+        sched.step()
+        logging.info("[DISTILL] epoch %d/%d loss %.4f", epoch + 1, epochs, total / max(len(perm), 1))
+    return model, val_idx
+
+
+@torch.no_grad()
+def validate(model, dataset, indices, conf_thresh=0.3, radius=MATCH_RADIUS):
+    """
+    Compare student detections with the teacher on held-out frames.
+    Returns mean position error (px) over matched objects, recall and
+    precision, plus the per-frame latencies from benchmark().
+    """
+    model.eval()
+    classes, frames, labels = dataset["classes"], dataset["frames"], dataset["labels"]
+    heat, off = model(to_input(frames[indices]))
+    decoded = decode(heat, off, conf_thresh)
+
+    errors, n_teacher, n_student = [], 0, 0
+    for i, per_class in zip(indices, decoded):
+        for key, (pred, _) in zip(classes, per_class):
+            teacher = labels[i][key]
+            n_teacher += len(teacher)
+            n_student += len(pred)
+            if not len(teacher) or not len(pred):
+                continue
+            dist = np.linalg.norm(teacher[:, None, :] - pred[None, :, :], axis=2)
+            used = set()
+            for t in np.argsort(dist.min(axis=1)):
+                j = int(np.argmin(dist[t]))
+                if dist[t, j] <= radius and j not in used:
+                    used.add(j)
+                    errors.append(dist[t, j])
+    matched = len(errors)
+    metrics = {
+        "mean_error_px": float(np.mean(errors)) if errors else float("nan"),
+        "recall": matched / n_teacher if n_teacher else float("nan"),
+        "precision": matched / n_student if n_student else float("nan"),
+    }
+    metrics.update(benchmark(model, frames[indices[:BENCH_FRAMES]], conf_thresh))
+    return metrics
+
+
+def _latency_ms(fn, frames, warmup=BENCH_WARMUP):
+    for frame in frames[:warmup]:
+        fn(frame)
+    start = time.perf_counter()
+    for frame in frames:
+        fn(frame)
+    return (time.perf_counter() - start) * 1000 / max(len(frames), 1)
+
+
+@torch.no_grad()
+def benchmark(model, frames, conf_thresh=0.3):
+    """
+    Per-frame latency in ms of student and teacher at batch size 1, the way
+    the agent calls them: preprocessing, forward pass and decoding/NMS.
+    Returns student_ms, teacher_ms and speedup.
+    """
+    from .state_extractor import detect_batch
+    model.eval()
+    student = _latency_ms(lambda f: decode(*model(to_input([f])), conf_thresh), frames)
+    teacher = _latency_ms(lambda f: detect_batch([f], backend="yolo"), frames)
+    return {"student_ms": student, "teacher_ms": teacher, "speedup": teacher / student if student else float("nan")}
+
+
+def export(model, classes, path=TINY_MODEL_PATH):
+    """Save a checkpoint that state_extractor can load with DETECTOR_BACKEND=tiny."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    width = model.backbone[1][0].out_channels
+    torch.save({"state_dict": model.state_dict(), "classes": list(classes), "width": width}, path)
+    logging.info("Exported tiny detector to %s", path)
+    return path
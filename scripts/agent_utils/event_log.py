@@ -0,0 +1,196 @@
+# scripts/agent_utils/event_log.py
+
+import glob
+import json
+import logging
+import os
+import re
+import struct
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from .reward_model import REWARD_COMPONENTS
+
+# Actions are stored as a bitmask over this fixed key order
+ACTION_KEYS = ("up", "down", "left", "right", "shift", "alt")
+# Numeric HUD tokens kept per record (padded with -1) when the calibrated
+# HUD field count is unknown
+HUD_SLOTS = int(os.getenv("EVENT_HUD_SLOTS", "8"))
+TIMING_STAGES = ("capture", "detect", "hud", "action", "reward")
+
+
+def event_dtype(hud_slots=HUD_SLOTS):
+    """Record layout for a log keeping hud_slots HUD values per step."""
+    return np.dtype(
+        [("time", "<f8"), ("episode", "<i4"), ("action_id", "<u2"), ("reward", "<f4")]
+        + [("r_" + name, "<f4") for name in REWARD_COMPONENTS]
+        + [("dx", "<f4"), ("dy", "<f4"), ("hud", "<i4", (hud_slots,))]
+        + [("t_" + stage, "<f4") for stage in TIMING_STAGES]
+    )
+
+
+EVENT_DTYPE = event_dtype()
+
+_MAGIC = b"APRLEV01"
+EVENT_LOG_DIR = os.getenv("EVENT_LOG_DIR", "logs/events")
+EVENT_LOG_MAX_BYTES = int(os.getenv("EVENT_LOG_MAX_BYTES", str(16 * 1024 * 1024)))
+# Newest segments kept on disk after each rotation (0 = keep all)
+EVENT_LOG_KEEP = int(os.getenv("EVENT_LOG_KEEP", "0"))
+FLUSH_INTERVAL = 0.5
+
+
+def _segment_paths(directory):
+    """Segment files in directory as [(index, path)], oldest first."""
+    segments = []
+    for path in glob.glob(os.path.join(directory, "events_*.bin")):
+        m = re.fullmatch(r"events_(\d+)\.bin", os.path.basename(path))
+        if m:
+            segments.append((int(m.group(1)), path))
+    return sorted(segments)
+
+
+def action_id(keys):
+    """Encode a key sequence as a bitmask over ACTION_KEYS (unknown keys are ignored)."""
+    mask = 0
+    for k in keys:
+        if k in ACTION_KEYS:
+            mask |= 1 << ACTION_KEYS.index(k)
+    return mask
+
+
+def action_keys(mask):
+    """Decode an action bitmask back into its key list."""
+    return [k for i, k in enumerate(ACTION_KEYS) if mask & (1 << i)]
+
+
+def hud_values(hud_text, slots=HUD_SLOTS):
+    """Parse up to slots numeric tokens from HUD text, padded with -1."""
+    nums = [int(t) for t in hud_text.split() if t.isdigit()][:slots]
+    return tuple(nums + [-1] * (slots - len(nums)))
+
+
+class EventLog:
+    """
+    Per-step structured event stream.
+    log_step() builds one record tuple and appends it to a deque (append and
+    popleft are atomic, so the producer never takes a lock). A background thread
+    drains the deque in batches and writes the records as raw fixed-size rows,
+    rotating to a new segment file once EVENT_LOG_MAX_BYTES is exceeded and
+    keeping only the newest keep segments (0 = all).
+    hud_slots should match the calibrated HUD field count so no value is cut off.
+    """
+
+    def __init__(self, directory=EVENT_LOG_DIR, max_bytes=EVENT_LOG_MAX_BYTES, hud_slots=HUD_SLOTS,
+                 keep=EVENT_LOG_KEEP):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.keep = keep
+        self.hud_slots = hud_slots
+        self.dtype = event_dtype(hud_slots)
+        os.makedirs(directory, exist_ok=True)
+        # continue after the highest index; older segments may have been deleted
+        existing = _segment_paths(directory)
+        self._segment = existing[-1][0] + 1 if existing else 0
+        self._file = None
+        self._queue = deque()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="event-log-writer", daemon=True)
+        self._thread.start()
+
+    def log_step(self, episode, action, reward, components, dx, dy, hud_text, timings):
+        self._queue.append((
+            time.time(), episode, action_id(action), reward,
+            *(components.get(name, 0.0) for name in REWARD_COMPONENTS),
+            dx, dy, hud_values(hud_text, self.hud_slots),
+            *(timings.get(stage, 0.0) for stage in TIMING_STAGES),
+        ))
+
+    def _open_segment(self):
+        path = os.path.join(self.directory, f"events_{self._segment:05d}.bin")
+        self._segment += 1
+        header = json.dumps({
+            "dtype": self.dtype.descr,
+            "action_keys": ACTION_KEYS,
+        }).encode()
+        # "x": never overwrite an existing segment
+        self._file = open(path, "xb")
+        self._file.write(_MAGIC + struct.pack("<I", len(header)) + header)
+        if self.keep:
+            for _, old in _segment_paths(self.directory)[:-self.keep]:
+                os.remove(old)
+
+    def _drain(self):
+        rows = []
+        while self._queue:
+            rows.append(self._queue.popleft())
+        if not rows:
+            return
+        if self._file is None or self._file.tell() >= self.max_bytes:
+            if self._file is not None:
+                self._file.close()
+            self._open_segment()
+        self._file.write(np.array(rows, dtype=self.dtype).tobytes())
+        self._file.flush()
+
+    def _run(self):
+        while not self._stop.wait(FLUSH_INTERVAL):
+            try:
+                self._drain()
+            except Exception as e:
+                logging.error("Event log write failed: %s", e)
+        self._drain()
+
+    def close(self):
+        """Flush queued records and stop the writer thread."""
+        self._stop.set()
+        self._thread.join()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def read_segment(path):
+    """Read one segment file into a structured array."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:len(_MAGIC)] != _MAGIC:
+        raise ValueError(f"{path} is not an event log segment")
+    offset = len(_MAGIC) + 4
+    (header_len,) = struct.unpack("<I", data[len(_MAGIC):offset])
+    header = json.loads(data[offset:offset + header_len])
+    # JSON turns descr tuples (and subarray shapes) into lists
+    dtype = np.dtype([
+        (f[0], f[1], tuple(f[2])) if len(f) == 3 else (f[0], f[1])
+        for f in header["dtype"]
+    ])
+    body = data[offset + header_len:]
+    # drop a partially written trailing record, e.g. after a crash
+    usable = len(body) - len(body) % dtype.itemsize
+    return np.frombuffer(body[:usable], dtype=dtype)
+
+
+def read_events(directory=EVENT_LOG_DIR):
+    """
+    Concatenate all segments in directory into one structured array, oldest first.
+    Segments written with fewer HUD slots are padded with -1 to the widest one.
+    """
+    paths = [path for _, path in _segment_paths(directory)]
+    if not paths:
+        return np.empty(0, dtype=EVENT_DTYPE)
+    segments = [read_segment(p) for p in paths]
+    dtype = event_dtype(max(s.dtype["hud"].shape[0] for s in segments))
+    widened = []
+    for seg in segments:
+        if seg.dtype != dtype:
+            out = np.empty(len(seg), dtype=dtype)
+            for name in seg.dtype.names:
+                if name != "hud":
+                    out[name] = seg[name]
+            out["hud"] = -1
+            out["hud"][:, :seg.dtype["hud"].shape[0]] = seg["hud"]
+            seg = out
+        widened.append(seg)
+    return np.concatenate(widened)
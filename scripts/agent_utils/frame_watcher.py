@@ -0,0 +1,65 @@
+# scripts/agent_utils/frame_watcher.py
+
+import os
+import time
+import cv2
+import numpy as np
+
+# Thumbnail size used for change detection (width, height)
+THUMB_SIZE = (32, 30)
+# Mean absolute thumbnail difference (0-255 scale) that counts as "changed"
+CHANGE_THRESHOLD = float(os.getenv("CHANGE_THRESHOLD", "2.0"))
+# Below this difference between consecutive polls the screen counts as settled
+SETTLE_THRESHOLD = float(os.getenv("SETTLE_THRESHOLD", "0.5"))
+POLL_INTERVAL = 0.01
+# Extra polls allowed for the screen to settle after a change (settle=True only)
+SETTLE_POLLS = 3
+
+
+def frame_signature(img):
+    """
+    Reduce a frame to a tiny grayscale thumbnail for cheap comparisons.
+    INTER_AREA averages each block, so sprite flicker and noise are smoothed out.
+    """
+    gray = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
+    thumb = cv2.resize(gray, THUMB_SIZE, interpolation=cv2.INTER_AREA)
+    return thumb.astype(np.int16)
+
+
+def frame_delta(sig_a, sig_b):
+    """Mean absolute difference between two frame signatures."""
+    return float(np.mean(np.abs(sig_a - sig_b)))
+
+
+def wait_for_frame_change(capture_fn, ref_img, timeout=0.2, settle=False,
+                          change_threshold=CHANGE_THRESHOLD,
+                          settle_threshold=SETTLE_THRESHOLD,
+                          settle_polls=SETTLE_POLLS):
+    """
+    Block until the screen differs meaningfully from ref_img, or timeout expires.
+    Returns as soon as the change is seen. With settle=True, poll at most
+    settle_polls more frames and stop early once two consecutive frames agree;
+    scrolling screens never fully settle, so this window stays short.
+    Returns (img, changed).
+    """
+    ref_sig = frame_signature(ref_img)
+    deadline = time.time() + timeout
+    img = capture_fn()
+    sig = frame_signature(img)
+    while frame_delta(sig, ref_sig) < change_threshold:
+        if time.time() >= deadline:
+            return img, False
+        time.sleep(POLL_INTERVAL)
+        img = capture_fn()
+        sig = frame_signature(img)
+
+    if settle:
+        for _ in range(settle_polls):
+            time.sleep(POLL_INTERVAL)
+            next_img = capture_fn()
+            next_sig = frame_signature(next_img)
+            settled = frame_delta(next_sig, sig) < settle_threshold
+            img, sig = next_img, next_sig
+            if settled:
+                break
+    return img, True
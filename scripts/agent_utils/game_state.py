@@ -0,0 +1,125 @@
+# scripts/agent_utils/game_state.py
+
+import numpy as np
+
+POS_DTYPE = np.float32
+CONF_DTYPE = np.float32
+ID_DTYPE = np.int32
+
+_EMPTY_POS = np.empty((0, 2), dtype=POS_DTYPE)
+_EMPTY_CONF = np.empty(0, dtype=CONF_DTYPE)
+_EMPTY_IDS = np.empty(0, dtype=ID_DTYPE)
+
+
+class GameState:
+    """
+    Detected objects as fixed-dtype arrays per object class.
+    positions[key] is (n, 2) float32 centers, confidences[key] is (n,) float32
+    and track_ids[key] is (n,) int32, rows sorted by descending confidence.
+    Scalar signals that do not come from detection (e.g. level_progress) live
+    in extras.
+    """
+
+    __slots__ = ("positions", "confidences", "track_ids", "extras", "_hash")
+
+    def __init__(self, positions, confidences=None, track_ids=None, extras=None):
+        self.positions = positions
+        self.confidences = confidences if confidences is not None else {
+            k: np.ones(len(v), dtype=CONF_DTYPE) for k, v in positions.items()
+        }
+        self.track_ids = track_ids if track_ids is not None else {
+            k: np.full(len(v), -1, dtype=ID_DTYPE) for k, v in positions.items()
+        }
+        self.extras = extras if extras is not None else {}
+        self._hash = None
+
+    @classmethod
+    def empty(cls, keys):
+        return cls({k: _EMPTY_POS for k in keys}, {k: _EMPTY_CONF for k in keys}, {k: _EMPTY_IDS for k in keys})
+
+    @property
+    def player_pos(self):
+        """Highest-confidence player center as (x, y), or None."""
+        pos = self.positions.get("player")
+        if pos is None or not len(pos):
+            return None
+        return float(pos[0, 0]), float(pos[0, 1])
+
+    def count(self, key):
+        pos = self.positions.get(key)
+        return 0 if pos is None else len(pos)
+
+    def replace(self, **extras):
+        """Return a copy with updated extras; detection arrays are shared, not copied."""
+        merged = dict(self.extras)
+        merged.update(extras)
+        return GameState(self.positions, self.confidences, self.track_ids, merged)
+
+    def __eq__(self, other):
+        if not isinstance(other, GameState):
+            return NotImplemented
+        if self.positions.keys() != other.positions.keys() or self.extras != other.extras:
+            return False
+        return all(np.array_equal(v, other.positions[k]) for k, v in self.positions.items())
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash((
+                tuple((k, v.tobytes()) for k, v in sorted(self.positions.items())),
+                tuple(sorted(self.extras.items())),
+            ))
+        return self._hash
+
+    def __repr__(self):
+        counts = ", ".join(f"{k}={len(v)}" for k, v in self.positions.items())
+        return f"GameState({counts}, extras={self.extras})"
+
+    @staticmethod
+    def stack(states, keys=None):
+        """
+        Batch states into {key: (B, max_n, 2) positions padded with NaN} and
+        {key: (B,) counts}.
+        """
+        keys = keys if keys is not None else list(states[0].positions)
+        positions, counts = {}, {}
+        for key in keys:
+            n = np.array([s.count(key) for s in states], dtype=np.int64)
+            batch = np.full((len(states), int(n.max(initial=0)), 2), np.nan, dtype=POS_DTYPE)
+            for i, s in enumerate(states):
+                if n[i]:
+                    batch[i, :n[i]] = s.positions[key]
+            positions[key] = batch
+            counts[key] = n
+        return positions, counts
+
+
+class CentroidTracker:
+    """
+    Greedy nearest-centroid association per object class.
+    Detections within max_distance pixels of a previous-frame object inherit
+    its id; the rest get fresh ids.
+    """
+
+    def __init__(self, max_distance=32.0):
+        self.max_distance = max_distance
+        self._next_id = 0
+        self._prev = {}  # key -> (positions, ids)
+
+    def assign(self, key, positions):
+        ids = np.full(len(positions), -1, dtype=ID_DTYPE)
+        prev = self._prev.get(key)
+        if prev is not None and len(prev[0]) and len(positions):
+            prev_pos, prev_ids = prev
+            dist = np.linalg.norm(positions[:, None, :] - prev_pos[None, :, :], axis=2)
+            # closest pairs first, each previous object used at most once
+            for flat in np.argsort(dist, axis=None):
+                i, j = divmod(int(flat), dist.shape[1])
+                if dist[i, j] > self.max_distance:
+                    break
+                if ids[i] < 0 and prev_ids[j] not in ids:
+                    ids[i] = prev_ids[j]
+        for i in np.flatnonzero(ids < 0):
+            ids[i] = self._next_id
+            self._next_id += 1
+        self._prev[key] = (positions, ids)
+        return ids
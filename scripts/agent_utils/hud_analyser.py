@@ -70,6 +70,25 @@ class HUDAnalyser:
             reward += info["direction"] * info["weight"] * delta
         return reward
 
+    def get_state(self):
+        """Return a copy of the analyser history and derived slot info."""
+        return {
+            "history": list(self.history),
+            "history_length": self.history.maxlen,
+            "slot_names": self.slot_names,
+            "expected_len": self.expected_len,
+            "slots_info": self.slots_info,
+            "last_tokens": self._last_tokens,
+        }
+
+    def set_state(self, state):
+        """Restore state previously returned by get_state()."""
+        self.history = deque(state["history"], maxlen=state["history_length"])
+        self.slot_names = state["slot_names"]
+        self.expected_len = state["expected_len"]
+        self.slots_info = dict(state["slots_info"])
+        self._last_tokens = state["last_tokens"]
+
     def debug_slot_info(self):
         # Returns a dict keyed by slot names (if provided) or indices
         return self.slots_info
\ No newline at end of file
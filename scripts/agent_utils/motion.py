@@ -0,0 +1,163 @@
+# scripts/agent_utils/motion.py
+
+import logging
+import os
+import threading
+
+import cv2
+import numpy as np
+
+# Downsampled size (width, height) used for phase correlation
+MOTION_SIZE = (128, 120)
+# Fraction of the frame height at the top (HUD) left out of scroll estimation
+HUD_FRACTION = 0.2
+# Phase-correlation peaks weaker than this are treated as "no reliable shift"
+MIN_RESPONSE = 0.1
+# Player patch half-size and search radius in frame pixels
+PATCH_RADIUS = 8
+SEARCH_RADIUS = 24
+MIN_MATCH = 0.5
+# Displacements below this many frame pixels count as "did not move"
+MOTION_EPSILON = 0.5
+# Background sampling rate in Hz (0 = only frames fed by the caller). Every
+# sample is an extra screen capture (on macOS PIL spawns `screencapture` per
+# grab), competing with the main loop's captures; keep this low. A few Hz keep
+# per-sample scroll well inside the phase-correlation range.
+MOTION_HZ = float(os.getenv("MOTION_HZ", "5"))
+
+
+class MotionEstimator:
+    """
+    Detector-free motion estimate between frames.
+    Background scroll comes from phase correlation of downsampled grayscale
+    frames (HUD rows excluded) and is accumulated into level_progress, measured
+    in screen widths. The player is followed by block matching a small patch
+    around the last known position, seeded from the detector with anchor().
+    """
+
+    def __init__(self, size=MOTION_SIZE):
+        self.size = size
+        h = int(size[1] * (1 - HUD_FRACTION))
+        self._window = cv2.createHanningWindow((size[0], h), cv2.CV_32F)
+        self._prev_small = None
+        self._patch = None
+        self._player = None
+        self.level_progress = 0.0
+        # accumulated since the last anchor()
+        self._scroll_dx = 0.0
+        self._track_dx = 0.0
+        self._track_dy = 0.0
+        self._tracked = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _small(self, gray):
+        small = cv2.resize(gray, self.size, interpolation=cv2.INTER_AREA).astype(np.float32)
+        return small[self.size[1] - self._window.shape[0]:]
+
+    def feed(self, frame):
+        """Update scroll and player track with a new RGB frame."""
+        gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
+        small = self._small(gray)
+        width = gray.shape[1]
+        with self._lock:
+            camera_dx = 0.0
+            if self._prev_small is not None:
+                (sx, _), response = cv2.phaseCorrelate(self._prev_small, small, self._window)
+                if response >= MIN_RESPONSE:
+                    # background moving left means the camera scrolled right
+                    camera_dx = -sx * width / self.size[0]
+            self._prev_small = small
+            self._scroll_dx += camera_dx
+            self.level_progress += camera_dx / width
+
+            if self._patch is not None:
+                self._track(gray, camera_dx)
+
+    def _track(self, gray, camera_dx):
+        px, py = self._player
+        x0 = max(int(px) - PATCH_RADIUS - SEARCH_RADIUS, 0)
+        y0 = max(int(py) - PATCH_RADIUS - SEARCH_RADIUS, 0)
+        x1 = min(int(px) + PATCH_RADIUS + SEARCH_RADIUS, gray.shape[1])
+        y1 = min(int(py) + PATCH_RADIUS + SEARCH_RADIUS, gray.shape[0])
+        search = gray[y0:y1, x0:x1]
+        if search.shape[0] < self._patch.shape[0] or search.shape[1] < self._patch.shape[1]:
+            self._patch = None
+            return
+        res = cv2.matchTemplate(search, self._patch, cv2.TM_CCOEFF_NORMED)
+        _, score, _, loc = cv2.minMaxLoc(res)
+        if score < MIN_MATCH:
+            # lost the player until the detector re-anchors it
+            self._patch = None
+            return
+        nx = x0 + loc[0] + PATCH_RADIUS
+        ny = y0 + loc[1] + PATCH_RADIUS
+        # world displacement = on-screen displacement + camera scroll
+        self._track_dx += (nx - px) + camera_dx
+        self._track_dy += ny - py
+        self._tracked = True
+        self._player = (nx, ny)
+        self._patch = self._cut_patch(gray, nx, ny)
+
+    @staticmethod
+    def _cut_patch(gray, x, y):
+        x, y = int(x), int(y)
+        if x < PATCH_RADIUS or y < PATCH_RADIUS or x + PATCH_RADIUS > gray.shape[1] or y + PATCH_RADIUS > gray.shape[0]:
+            return None
+        return gray[y - PATCH_RADIUS:y + PATCH_RADIUS, x - PATCH_RADIUS:x + PATCH_RADIUS].copy()
+
+    def anchor(self, player_pos, frame):
+        """Re-seed the player track from a detection and reset step accumulators."""
+        gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
+        with self._lock:
+            self._scroll_dx = self._track_dx = self._track_dy = 0.0
+            self._tracked = False
+            if player_pos is None:
+                self._patch = self._player = None
+            else:
+                self._player = player_pos
+                self._patch = self._cut_patch(gray, *player_pos)
+
+    def rebase(self):
+        """Reset step accumulators but keep following the player patch."""
+        with self._lock:
+            self._scroll_dx = self._track_dx = self._track_dy = 0.0
+            self._tracked = False
+
+    def step_motion(self, prev_pos, next_pos):
+        """
+        Player (dx, dy) since the last anchor(), in frame pixels with scroll included.
+        Uses the detector when both positions exist, then the patch track, then
+        the background scroll alone. prev_pos must come from the frame passed
+        to anchor(), so scroll and detector displacement share a start.
+        """
+        with self._lock:
+            scroll_dx = self._scroll_dx
+            tracked, track_dx, track_dy = self._tracked, self._track_dx, self._track_dy
+        if prev_pos is not None and next_pos is not None:
+            return next_pos[0] - prev_pos[0] + scroll_dx, next_pos[1] - prev_pos[1]
+        if tracked:
+            return track_dx, track_dy
+        return scroll_dx, 0.0
+
+    def start(self, capture_fn, hz=MOTION_HZ):
+        """Feed frames from capture_fn on a background thread at hz samples per second."""
+        if hz <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(capture_fn, 1.0 / hz), name="motion", daemon=True)
+        self._thread.start()
+
+    def _run(self, capture_fn, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.feed(capture_fn())
+            except Exception as e:
+                logging.debug("Motion sample failed: %s", e)
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
@@ -3,11 +3,16 @@ import os
 from .reward_memory import reward_table
 from .actions import set_action_universe
 from .actions import random_key_combination
+from .actions import get_action_universe
+from .contextual_policy import LinUCB
 import numpy as np
 from itertools import combinations
 SOFTMAX_TEMPERATURE = float(os.getenv("SOFTMAX_TEMPERATURE", "1.0"))
 USE_SOFTMAX = os.getenv("USE_SOFTMAX", "1") == "1"
 MAX_COMBO_KEYS = int(os.getenv("MAX_COMBO_KEYS", "2"))
+# contextual bandit (LinUCB) instead of epsilon-greedy when a context is supplied
+USE_CONTEXTUAL = os.getenv("USE_CONTEXTUAL", "0") == "1"
+LINUCB_ALPHA = float(os.getenv("LINUCB_ALPHA", "1.0"))
 
 # dynamic action generation settings
 BASIC_KEYS = ["up", "down", "left", "right", "shift", "alt"]
@@ -17,8 +22,9 @@ FORWARD_BIAS = 0.05
 
 epsilon = 0.9
 bad_actions = set()
+contextual = LinUCB(alpha=LINUCB_ALPHA)
 
-def choose_action(ep=None, max_keys=MAX_COMBO_KEYS, bad_action_streak=0):
+def choose_action(ep=None, max_keys=MAX_COMBO_KEYS, bad_action_streak=0, context=None, exclude=()):
 
     # initialize or update dynamic action universe
     if ep is not None:
@@ -40,6 +46,13 @@ def choose_action(ep=None, max_keys=MAX_COMBO_KEYS, bad_action_streak=0):
             if '+' not in act and abs(rew) < 0.01:
                 bad_actions.add(act)
 
+    if USE_CONTEXTUAL and context is not None:
+        candidates = [a for a in get_action_universe()
+                      if '+'.join(a) not in bad_actions and '+'.join(a) not in exclude]
+        if not candidates:
+            candidates = get_action_universe()
+        return contextual.select(candidates, context)
+
     # occasionally pick the historically best action to avoid stagnation
     if reward_table and random.random() < FORWARD_BIAS:
         best = max(reward_table.items(), key=lambda kv: kv[1])[0]
@@ -78,11 +91,30 @@ def choose_action(ep=None, max_keys=MAX_COMBO_KEYS, bad_action_streak=0):
 
     return action
 
+def update_contextual(action, context, reward):
+    """Feed the observed reward back to the contextual bandit."""
+    if USE_CONTEXTUAL and context is not None:
+        contextual.update(action, context, reward)
+
 def decay_epsilon():
     global epsilon
     epsilon = max(0.01, epsilon * 0.995)
 
 
+def get_state():
+    """Return a copy of the mutable policy state."""
+    return {"epsilon": epsilon, "bad_actions": set(bad_actions), "contextual": contextual.get_state()}
+
+def set_state(state):
+    """Restore state previously returned by get_state()."""
+    global epsilon
+    epsilon = state["epsilon"]
+    bad_actions.clear()
+    bad_actions.update(state["bad_actions"])
+    if "contextual" in state:
+        contextual.set_state(state["contextual"])
+
+
 def get_action_duration(action):
     """
     Compute a duration for the given action sequence.
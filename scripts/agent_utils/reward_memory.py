@@ -20,10 +20,22 @@ def save_rewards(path='data/memory.pkl'):
         pickle.dump(reward_table, f)
 
 def load_rewards(path='data/memory.pkl'):
-    global reward_table
+    # update in place: policy and agent hold references to reward_table
     if os.path.exists(path):
         with open(path, 'rb') as f:
-            reward_table = pickle.load(f)
+            reward_table.clear()
+            reward_table.update(pickle.load(f))
+
+def get_state():
+    """Return a copy of the reward table and usage counts."""
+    return {"reward_table": dict(reward_table), "action_usage": dict(action_usage)}
+
+def set_state(state):
+    """Restore state previously returned by get_state()."""
+    reward_table.clear()
+    reward_table.update(state["reward_table"])
+    action_usage.clear()
+    action_usage.update(state["action_usage"])
 
 def get_best_action():
     if not reward_table:
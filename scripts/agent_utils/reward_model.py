@@ -3,19 +3,11 @@
 import numpy as np
 import os
 import logging
+from dataclasses import dataclass, fields
 
 # Optionally squash reward using tanh, controlled by environment variable
 USE_REWARD_TANH = os.getenv("USE_REWARD_TANH", "0") == "1"
 
-def _count(x):
-    """Return numeric value or length for iterables, else 0."""
-    if isinstance(x, (int, float)):
-        return x
-    try:
-        return len(x)
-    except Exception:
-        return 0
-
 # Reward model configuration
 HORIZONTAL_WEIGHT = 1.0
 STAGNATION_PENALTY = 0.02
@@ -38,30 +30,82 @@ ITEM_COLLECTION_WEIGHT = 0.5    # reward for picking up items or collectibles
 COMBO_BONUS = 0.2               # bonus for chaining actions or combos
 TIME_PENALTY = 0.01             # small penalty to encourage efficient play
 
-def calculate_reward(prev_state, next_state, hud_before, hud_after, hud_analyser, screen_shape, dx, dy):
-    reward = 0.0
-    # movement debug
-    logging.debug("Movement dx=%s, dy=%s", dx, dy)
+# Names of the per-term contributions reported through calculate_reward(components=...)
+REWARD_COMPONENTS = ("horizontal", "vertical", "hud", "enemy", "items", "life", "progress", "time")
+
+
+@dataclass
+class RewardWeights:
+    """
+    Reward weights as one config object; defaults are the module constants above.
+    Every field except hud_divisor scales one entry of reward_features().
+    """
+    horizontal: float = HORIZONTAL_WEIGHT
+    stagnation: float = STAGNATION_PENALTY
+    vertical: float = VERTICAL_WEIGHT
+    downward: float = DOWNWARD_PENALTY
+    enemy_kill: float = ENEMY_KILL_WEIGHT
+    close_penalty: float = CLOSE_PENALTY_WEIGHT
+    enemy_avoid: float = ENEMY_AVOID_WEIGHT
+    coin: float = COIN_WEIGHT
+    powerup: float = POWERUP_WEIGHT
+    life_loss: float = LIFE_LOSS_PENALTY
+    progression: float = PROGRESSION_WEIGHT
+    item_collection: float = ITEM_COLLECTION_WEIGHT
+    combo: float = COMBO_BONUS
+    time: float = TIME_PENALTY
+    hud_divisor: float = HUD_DIVISOR
+
+    def linear_vector(self):
+        """Weights aligned with FEATURE_NAMES."""
+        return np.array([getattr(self, name) for name in FEATURE_NAMES], dtype=float)
+
+
+# Linear reward features, in the order used by reward_features() and RewardWeights.linear_vector()
+FEATURE_NAMES = tuple(f.name for f in fields(RewardWeights) if f.name != "hud_divisor")
+_FEATURE_INDEX = {name: i for i, name in enumerate(FEATURE_NAMES)}
+# Which features make up each reported component (hud is handled separately)
+COMPONENT_FEATURES = {
+    "horizontal": ("horizontal", "stagnation"),
+    "vertical": ("vertical", "downward"),
+    "enemy": ("enemy_kill", "close_penalty", "enemy_avoid"),
+    "items": ("coin", "powerup", "item_collection", "combo"),
+    "life": ("life_loss",),
+    "progress": ("progression",),
+    "time": ("time",),
+}
+
+
+def reward_features(prev_state, next_state, hud_before, hud_after, weighted_hud_delta, screen_shape):
+    """
+    Reduce a transition to weight-independent terms.
+    Returns (features, raw_hud_delta, weighted_scaled): the reward is
+    features @ weights.linear_vector() + tanh(raw_hud_delta / hud_divisor) + weighted_scaled.
+    Penalty features are negative so every weight is a positive magnitude.
+    States are GameStates; object counts and positions come straight from their
+    arrays, scalar signals (level_progress, ...) from their extras.
+    """
+    f = np.zeros(len(FEATURE_NAMES))
+    idx = _FEATURE_INDEX
 
     # 1) Horizontal progress (normalized)
-    p0 = prev_state.get("player_pos")
-    n0 = next_state.get("player_pos")
+    p0 = prev_state.player_pos
+    n0 = next_state.player_pos
     if p0 is not None and n0 is not None:
         dx = n0[0] - p0[0]
-        reward += HORIZONTAL_WEIGHT * dx / screen_shape[1]
+        f[idx["horizontal"]] = dx / screen_shape[1]
         # 1b) Stagnation penalty: discourage no horizontal progress
         if dx == 0:
-            reward -= STAGNATION_PENALTY
+            f[idx["stagnation"]] = -1.0
 
         # 1c) Vertical progress: normalized upward movement
         # (assumes origin at top-left; moving up decreases the y-coordinate)
         py, ny = p0[1], n0[1]
         vy = (py - ny) / screen_shape[0]  # upward positive
-        # weight vertical less than horizontal
-        reward += VERTICAL_WEIGHT * vy
+        f[idx["vertical"]] = vy
         # discourage downward movement
         if vy < 0:
-            reward += vy * DOWNWARD_PENALTY
+            f[idx["downward"]] = vy
 
     # 2) HUD contributions: raw digit change + weighted delta
     prev_tokens = hud_before.get("hud_text", "").split()
@@ -71,57 +115,36 @@ def calculate_reward(prev_state, next_state, hud_before, hud_after, hud_analyser
     raw_after  = sum(int(t) for t in curr_tokens if t.isdigit())
     raw_hud_delta = raw_after - raw_before
     raw_hud_delta = max(min(raw_hud_delta, 100), -100)  # Clamp extreme values
-    # weighted HUD delta from analyser
-    weighted_hud_delta = hud_analyser.get_reward_delta(prev_tokens, curr_tokens)
-    # smooth and normalize HUD contributions
-    # raw HUD: compress large jumps via tanh, safer scaling
-    raw_scaled = np.tanh(raw_hud_delta / HUD_DIVISOR)
-    # weighted HUD: also compress via tanh
+    # weighted HUD: compress via tanh
     weighted_scaled = np.tanh(weighted_hud_delta)
-    reward += raw_scaled + weighted_scaled
-    logging.debug(
-        "[REWARD DEBUG] raw=%+.2f -> scaled=%+.2f, weighted=%+.2f -> scaled=%+.2f, combined=%+.2f, total_reward=%+.2f",
-        raw_hud_delta,
-        raw_scaled,
-        weighted_hud_delta,
-        weighted_scaled,
-        raw_scaled + weighted_scaled,
-        reward,
-    )
 
     # 3) Enemy handling: reward defeating or avoiding enemies
     # 3a) Reward for defeating enemies (reducing enemy count)
-    prev_enemies_list = prev_state.get("enemies", [])
-    next_enemies_list = next_state.get("enemies", [])
-    defeated = max(_count(prev_enemies_list) - _count(next_enemies_list), 0)
-    reward += ENEMY_KILL_WEIGHT * defeated
+    defeated = max(prev_state.count("enemy") - next_state.count("enemy"), 0)
+    f[idx["enemy_kill"]] = defeated
     # 3b) Avoidance and proximity penalty
-    prev_positions = prev_state.get("enemy_positions", [])
-    next_positions = next_state.get("enemy_positions", [])
-    if p0 is not None and prev_positions and next_positions and defeated == 0:
-        # compute min distance to enemy before and after
-        prev_dists = [np.hypot(p0[0]-ex, p0[1]-ey) for ex, ey in prev_positions]
-        next_dists = [np.hypot(n0[0]-ex, n0[1]-ey) for ex, ey in next_positions]
-        min_prev, min_next = min(prev_dists), min(next_dists)
+    if p0 is not None and n0 is not None and prev_state.count("enemy") and next_state.count("enemy") and defeated == 0:
+        # min distance to an enemy before and after
+        prev_positions = prev_state.positions["enemy"]
+        next_positions = next_state.positions["enemy"]
+        min_prev = float(np.min(np.hypot(prev_positions[:, 0] - p0[0], prev_positions[:, 1] - p0[1])))
+        min_next = float(np.min(np.hypot(next_positions[:, 0] - n0[0], next_positions[:, 1] - n0[1])))
         # penalty if too close initially
         if min_prev < ENEMY_PROXIMITY_THRESHOLD:
-            penalty = (ENEMY_PROXIMITY_THRESHOLD - min_prev) / ENEMY_PROXIMITY_THRESHOLD
-            reward -= CLOSE_PENALTY_WEIGHT * penalty
+            f[idx["close_penalty"]] = -(ENEMY_PROXIMITY_THRESHOLD - min_prev) / ENEMY_PROXIMITY_THRESHOLD
             # reward for moving away if stepping back
             delta = min_next - min_prev
             if delta > 0:
-                reward += ENEMY_AVOID_WEIGHT * delta
+                f[idx["enemy_avoid"]] = delta
 
     # 4) Explicit coin and power-up collection
-    coins_before = _count(prev_state.get("coins", 0))
-    coins_after  = _count(next_state.get("coins", 0))
-    delta_coins  = max(coins_after - coins_before, 0)
-    reward += COIN_WEIGHT * delta_coins
+    coins_before = prev_state.count("coin")
+    coins_after  = next_state.count("coin")
+    f[idx["coin"]] = max(coins_after - coins_before, 0)
 
-    powerups_before = _count(prev_state.get("powerups", 0))
-    powerups_after  = _count(next_state.get("powerups", 0))
-    delta_powerups = max(powerups_after - powerups_before, 0)
-    reward += POWERUP_WEIGHT * delta_powerups
+    powerups_before = prev_state.count("powerup")
+    powerups_after  = next_state.count("powerup")
+    f[idx["powerup"]] = max(powerups_after - powerups_before, 0)
 
     # Life loss penalty: heavily penalize losing a life (first HUD token assumed lives)
     try:
@@ -129,28 +152,65 @@ def calculate_reward(prev_state, next_state, hud_before, hud_after, hud_analyser
             prev_lives = int(prev_tokens[0]) if prev_tokens[0].isdigit() else None
             curr_lives = int(curr_tokens[0])  if curr_tokens[0].isdigit()  else None
             if prev_lives is not None and curr_lives is not None and curr_lives < prev_lives:
-                reward -= LIFE_LOSS_PENALTY * 5
+                f[idx["life_loss"]] = -5.0
     except Exception:
         pass
 
     # 5) Generic gameplay events
-    prog_before = prev_state.get("level_progress", 0)
-    prog_after  = next_state.get("level_progress", 0)
-    delta_prog  = prog_after - prog_before
-    reward += PROGRESSION_WEIGHT * delta_prog
+    prog_before = prev_state.extras.get("level_progress", 0)
+    prog_after  = next_state.extras.get("level_progress", 0)
+    f[idx["progression"]] = prog_after - prog_before
 
-    items_before = prev_state.get("items_collected", 0)
-    items_after  = next_state.get("items_collected", 0)
-    delta_items  = items_after - items_before
-    reward += ITEM_COLLECTION_WEIGHT * delta_items
+    items_before = prev_state.extras.get("items_collected", 0)
+    items_after  = next_state.extras.get("items_collected", 0)
+    f[idx["item_collection"]] = items_after - items_before
 
-    combo_before = prev_state.get("combo_count", 0)
-    combo_after  = next_state.get("combo_count", 0)
-    delta_combo  = max(combo_after - combo_before, 0)
-    reward += COMBO_BONUS * delta_combo
+    combo_before = prev_state.extras.get("combo_count", 0)
+    combo_after  = next_state.extras.get("combo_count", 0)
+    f[idx["combo"]] = max(combo_after - combo_before, 0)
 
     # time penalty to encourage faster completion
-    reward -= TIME_PENALTY
+    f[idx["time"]] = -1.0
+    return f, raw_hud_delta, weighted_scaled
+
+
+def calculate_reward(prev_state, next_state, hud_before, hud_after, hud_analyser, screen_shape, dx, dy,
+                     components=None, weights=None):
+    """
+    Score one transition under weights (default RewardWeights()). If a components
+    dict is given, it is filled with the contribution of each REWARD_COMPONENTS
+    term (before the optional tanh squash).
+    """
+    # movement debug
+    logging.debug("Movement dx=%s, dy=%s", dx, dy)
+    if weights is None:
+        weights = RewardWeights()
+
+    prev_tokens = hud_before.get("hud_text", "").split()
+    curr_tokens = hud_after.get("hud_text", "").split()
+    # weighted HUD delta from analyser
+    weighted_hud_delta = hud_analyser.get_reward_delta(prev_tokens, curr_tokens)
+    features, raw_hud_delta, weighted_scaled = reward_features(
+        prev_state, next_state, hud_before, hud_after, weighted_hud_delta, screen_shape
+    )
+    terms = features * weights.linear_vector()
+    # raw HUD: compress large jumps via tanh, safer scaling
+    raw_scaled = np.tanh(raw_hud_delta / weights.hud_divisor)
+    reward = float(terms.sum() + raw_scaled + weighted_scaled)
+    logging.debug(
+        "[REWARD DEBUG] raw=%+.2f -> scaled=%+.2f, weighted=%+.2f -> scaled=%+.2f, combined=%+.2f, total_reward=%+.2f",
+        raw_hud_delta,
+        raw_scaled,
+        weighted_hud_delta,
+        weighted_scaled,
+        raw_scaled + weighted_scaled,
+        reward,
+    )
+
+    if components is not None:
+        for name, members in COMPONENT_FEATURES.items():
+            components[name] = float(sum(terms[_FEATURE_INDEX[m]] for m in members))
+        components["hud"] = float(raw_scaled + weighted_scaled)
 
     # optionally squash reward into a bounded range
     if USE_REWARD_TANH:
@@ -0,0 +1,173 @@
+# scripts/agent_utils/reward_sweep.py
+
+import logging
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+
+import numpy as np
+from scipy.stats import rankdata
+
+from .reward_model import FEATURE_NAMES, RewardWeights, reward_features, USE_REWARD_TANH
+
+TRANSITION_LOG = os.getenv("TRANSITION_LOG", "")
+CHUNK_SIZE = 256  # configs scored per worker task
+
+
+class TransitionLog:
+    """Append-only pickle stream of transitions for offline reward tuning."""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(path, "ab")
+
+    def record(self, prev_state, next_state, hud_before, hud_after, weighted_hud_delta, screen_shape, label=None):
+        pickle.dump({
+            "prev_state": prev_state,
+            "next_state": next_state,
+            "hud_before": hud_before,
+            "hud_after": hud_after,
+            "weighted_hud_delta": weighted_hud_delta,
+            "screen_shape": tuple(screen_shape),
+            "label": label,
+        }, self._file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def close(self):
+        self._file.close()
+
+
+def load_transitions(path):
+    """Read every transition from a TransitionLog file."""
+    transitions = []
+    with open(path, "rb") as f:
+        while True:
+            try:
+                transitions.append(pickle.load(f))
+            except EOFError:
+                break
+    return transitions
+
+
+def outcome_label(t):
+    """
+    Default good/bad label for a transition: 0 if a life was lost, 1 if the
+    score or level progress went up, None (excluded from ranking) otherwise.
+    """
+    if t.get("label") is not None:
+        return t["label"]
+    before = [int(x) for x in t["hud_before"].get("hud_text", "").split() if x.isdigit()]
+    after = [int(x) for x in t["hud_after"].get("hud_text", "").split() if x.isdigit()]
+    if before and after and after[0] < before[0]:
+        return 0
+    if len(before) > 1 and len(before) == len(after) and after[1] > before[1]:
+        return 1
+    if t["next_state"].extras.get("level_progress", 0) > t["prev_state"].extras.get("level_progress", 0):
+        return 1
+    return None
+
+
+def featurize(transitions):
+    """Stack transitions into (features[n, F], raw_hud_delta[n], weighted_scaled[n])."""
+    rows, raw, weighted = [], [], []
+    for t in transitions:
+        f, r, w = reward_features(
+            t["prev_state"], t["next_state"], t["hud_before"], t["hud_after"],
+            t["weighted_hud_delta"], t["screen_shape"],
+        )
+        rows.append(f)
+        raw.append(r)
+        weighted.append(w)
+    return np.array(rows).reshape(-1, len(FEATURE_NAMES)), np.array(raw, dtype=float), np.array(weighted)
+
+
+def configs_to_arrays(configs):
+    """Turn a list of RewardWeights into (linear[k, F], hud_divisor[k])."""
+    linear = np.stack([c.linear_vector() for c in configs])
+    divisors = np.array([c.hud_divisor for c in configs], dtype=float)
+    return linear, divisors
+
+
+def random_configs(n, base=None, spread=0.5, seed=None):
+    """
+    Sample n configs around base by log-normal multiplicative noise, so every
+    weight keeps its sign. The base config itself is always included first.
+    """
+    base = base or RewardWeights()
+    rng = np.random.default_rng(seed)
+    names = FEATURE_NAMES + ("hud_divisor",)
+    values = np.array([getattr(base, name) for name in names])
+    noise = np.exp(rng.normal(0.0, spread, size=(n - 1, len(names))))
+    samples = values * noise
+    return [base] + [replace(base, **dict(zip(names, map(float, row)))) for row in samples]
+
+
+def score_rewards(features, raw_hud, weighted, linear, divisors, squash=USE_REWARD_TANH):
+    """
+    Rewards of every transition under every config, shape (k, n).
+    The config axis is broadcast against the transition axis in one pass.
+    """
+    rewards = linear @ features.T
+    rewards += np.tanh(raw_hud[None, :] / divisors[:, None])
+    rewards += weighted[None, :]
+    if squash:
+        rewards = np.tanh(rewards)
+    return rewards
+
+
+def separation_auc(rewards, labels):
+    """
+    Per-config ROC AUC of reward as a classifier of good (1) vs bad (0)
+    transitions: the probability a good transition outscores a bad one.
+    """
+    good = labels == 1
+    n_good, n_bad = good.sum(), (~good).sum()
+    ranks = rankdata(rewards, axis=1)  # average ranks handle ties
+    return (ranks[:, good].sum(axis=1) - n_good * (n_good + 1) / 2) / (n_good * n_bad)
+
+
+def _score_chunk(args):
+    features, raw_hud, weighted, labels, linear, divisors = args
+    return separation_auc(score_rewards(features, raw_hud, weighted, linear, divisors), labels)
+
+
+def sweep(transitions, configs, labels=None, processes=None, top_k=10, base=None):
+    """
+    Re-score logged transitions under every config and rank configs by how
+    well they separate good from bad outcomes. Features that are zero in every
+    transition are reported and left out; the returned configs carry the base
+    (default RewardWeights()) value for those weights, since they were never tested.
+    Returns [(auc, RewardWeights), ...] best first.
+    """
+    if labels is None:
+        labels = [outcome_label(t) for t in transitions]
+    keep = [i for i, lbl in enumerate(labels) if lbl is not None]
+    labels = np.array([labels[i] for i in keep], dtype=int)
+    if len(set(labels.tolist())) < 2:
+        raise ValueError("sweep needs both good and bad labelled transitions")
+    features, raw_hud, weighted = featurize([transitions[i] for i in keep])
+    linear, divisors = configs_to_arrays(configs)
+    # weights of features that never fire cannot change any score
+    live = features.any(axis=0)
+    dead = [name for name, on in zip(FEATURE_NAMES, live) if not on]
+    if dead:
+        logging.warning("Features zero in every transition, excluded from the sweep: %s", ", ".join(dead))
+        features, linear = features[:, live], linear[:, live]
+
+    tasks = [
+        (features, raw_hud, weighted, labels, linear[i:i + CHUNK_SIZE], divisors[i:i + CHUNK_SIZE])
+        for i in range(0, len(configs), CHUNK_SIZE)
+    ]
+    if processes == 1 or len(tasks) == 1:
+        scores = np.concatenate([_score_chunk(t) for t in tasks])
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            scores = np.concatenate(list(pool.map(_score_chunk, tasks)))
+
+    order = np.argsort(-scores)[:top_k]
+    logging.info("Swept %d configs over %d labelled transitions, best AUC %.3f",
+                 len(configs), len(labels), scores[order[0]])
+    base = base or RewardWeights()
+    reset = {name: getattr(base, name) for name in dead}
+    return [(float(scores[i]), replace(configs[i], **reset)) for i in order]
@@ -1,6 +1,17 @@
+import os
 import Quartz
 from PIL import ImageGrab
 import numpy as np
+import cv2
+
+# NES picture size (width, height); canonical frames are downsampled to this once
+NATIVE_SIZE = (256, 240)
+# Share one native-resolution frame between all pipeline stages
+CANONICAL_FRAMES = os.getenv("CANONICAL_FRAMES", "1") == "1"
+TITLE_BAR_HEIGHT = 30    # window points
+BORDER_TOLERANCE = 8.0   # max per-row/column std-dev for a uniform border line
+# Picture width / height: square pixels, and 8:7 pixel-aspect stretched
+NES_ASPECTS = (256 / 240, 256 * 8 / 7 / 240)
 
 def get_window_bounds_mac(window_name):
     """
@@ -22,7 +33,118 @@ def get_window_bounds_mac(window_name):
 def capture_screen(region=None):
     """Capture screen or a region."""
     img = ImageGrab.grab(bbox=region).convert("RGB")
-    return np.array(img)
+    # asarray wraps the pixel buffer instead of copying it again (result is read-only)
+    return np.asarray(img)
 
 def get_window_region(window_name="Nestopia"):
-    return get_window_bounds_mac(window_name)
\ No newline at end of file
+    return get_window_bounds_mac(window_name)
+
+
+class FrameScale:
+    """
+    Fixed map between a window capture and its canonical native frame.
+    viewport is (x, y, w, h) of the emulator picture in captured pixels.
+    """
+
+    def __init__(self, viewport, native_size=NATIVE_SIZE):
+        self.viewport = viewport
+        self.native_size = native_size
+        x, y, w, h = viewport
+        self.sx = w / native_size[0]
+        self.sy = h / native_size[1]
+
+    def to_capture(self, x, y):
+        """Native frame coordinates -> captured window pixels."""
+        return self.viewport[0] + x * self.sx, self.viewport[1] + y * self.sy
+
+    def to_native(self, x, y):
+        """Captured window pixels -> native frame coordinates."""
+        return (x - self.viewport[0]) / self.sx, (y - self.viewport[1]) / self.sy
+
+
+def _trim(profile_std, profile_mean, border_value):
+    """
+    Symmetric (start, end) band left after trimming uniform border-colored lines.
+    Emulators center the picture, so only as many lines are trimmed as both
+    ends have; a dark band on one side only is picture content.
+    """
+    border = (profile_std < BORDER_TOLERANCE) & (np.abs(profile_mean - border_value) < BORDER_TOLERANCE)
+    content = np.flatnonzero(~border)
+    if not len(content):
+        return None
+    margin = min(content[0], len(border) - 1 - content[-1])
+    return margin, len(border) - margin
+
+
+def _title_bar_rows(img, region=None):
+    # captured pixels per window point (2.0 on Retina displays)
+    scale = img.shape[1] / (region[2] - region[0]) if region is not None else 1.0
+    return int(round(TITLE_BAR_HEIGHT * scale))
+
+def below_title_bar(img, region=None):
+    """Fallback viewport: everything below the title bar."""
+    top = _title_bar_rows(img, region)
+    return 0, top, img.shape[1], img.shape[0] - top
+
+def detect_viewport(img, region=None):
+    """
+    Locate the emulator picture in a window capture: drop the title bar, then
+    trim uniform border columns and rows that share the corners' color.
+    Rows are never trimmed below the height the NES aspect ratio allows for the
+    detected width, so uniform dark rows inside the picture (e.g. on a
+    black-background stage) are kept; if trimming went that far, the picture
+    is taken as centered in the window instead.
+    Returns (x, y, w, h) in captured pixels, or None if nothing plausible was found
+    (e.g. on an all-black transition frame).
+    """
+    h, w = img.shape[:2]
+    top = _title_bar_rows(img, region)
+    gray = cv2.cvtColor(img[top:], cv2.COLOR_RGB2GRAY).astype(np.float32)
+    border_value = float(np.median([gray[0, 0], gray[0, -1], gray[-1, 0], gray[-1, -1]]))
+    cols = _trim(gray.std(axis=0), gray.mean(axis=0), border_value)
+    if cols is None:
+        return None
+    vx, vw = cols[0], cols[1] - cols[0]
+    avail = gray.shape[0]
+    rows = _trim(gray.std(axis=1), gray.mean(axis=1), border_value)
+    if rows is not None and rows[1] - rows[0] >= vw / max(NES_ASPECTS):
+        vy, vh = top + rows[0], rows[1] - rows[0]
+    else:
+        vh = min(avail, int(round(vw / NES_ASPECTS[0])))
+        vy = top + (avail - vh) // 2
+    aspect = vw / vh
+    # NES output is 256x240 (or 8:7 pixel-aspect stretched); reject implausible crops
+    if vw * vh < 0.5 * w * (h - top) or not 0.9 <= aspect <= 1.4:
+        return None
+    return int(vx), int(vy), int(vw), int(vh)
+
+
+_frame_scales = {}
+
+def get_frame_scale(img, region=None):
+    """Return the cached FrameScale for this capture size, detecting the viewport once."""
+    key = img.shape[:2]
+    fs = _frame_scales.get(key)
+    if fs is None:
+        viewport = detect_viewport(img, region)
+        if viewport is None:
+            # not cacheable yet: use everything below the title bar for this frame
+            return FrameScale(below_title_bar(img, region))
+        fs = FrameScale(viewport)
+        _frame_scales[key] = fs
+    return fs
+
+def canonicalize(img, frame_scale):
+    """Crop the viewport and downsample once to native resolution."""
+    x, y, w, h = frame_scale.viewport
+    return cv2.resize(img[y:y + h, x:x + w], frame_scale.native_size, interpolation=cv2.INTER_AREA)
+
+def capture_frame(region=None):
+    """
+    Capture the frame every pipeline stage works on: the canonical native
+    frame when CANONICAL_FRAMES is on, otherwise the raw window capture.
+    """
+    img = capture_screen(region)
+    if not CANONICAL_FRAMES:
+        return img
+    return canonicalize(img, get_frame_scale(img, region))
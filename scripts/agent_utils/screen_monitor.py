@@ -4,6 +4,7 @@ import os
 import cv2
 import numpy as np
 import logging
+from .screen_capture import NATIVE_SIZE, FrameScale, below_title_bar, canonicalize, detect_viewport
 
 # load your templates once
 TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), "templates")
@@ -16,13 +17,52 @@ for name in TEMPLATE_NAMES:
         logging.warning("Failed to load template: %s", path)
     TEMPLATES.append(tpl)
 
+# Fraction of each canonical template cut from every side, so matchTemplate can
+# absorb small viewport offsets between the template and the frame
+TEMPLATE_MARGIN = 0.1
+
+# templates resized to fit each frame size they are matched against
+_fitted_templates = {}
+
+def _canonical_template(tpl):
+    """
+    Map a full-window template into canonical frame space with the same
+    viewport detection and downsampling as capture_frame, then keep its center.
+    """
+    rgb = cv2.cvtColor(tpl, cv2.COLOR_GRAY2RGB)
+    viewport = detect_viewport(rgb) or below_title_bar(rgb)
+    native = cv2.cvtColor(canonicalize(rgb, FrameScale(viewport)), cv2.COLOR_RGB2GRAY)
+    mh, mw = int(native.shape[0] * TEMPLATE_MARGIN), int(native.shape[1] * TEMPLATE_MARGIN)
+    return native[mh:native.shape[0] - mh, mw:native.shape[1] - mw]
+
+def _templates_for(shape):
+    """
+    Templates were captured from the full window. Canonical native frames get
+    templates canonicalized the same way; for other frames shrink any template
+    larger than the frame so it fits, keeping aspect.
+    """
+    fitted = _fitted_templates.get(shape)
+    if fitted is None:
+        fitted = []
+        canonical = shape == (NATIVE_SIZE[1], NATIVE_SIZE[0])
+        for tpl in TEMPLATES:
+            if tpl is not None and canonical:
+                tpl = _canonical_template(tpl)
+            elif tpl is not None and (tpl.shape[0] > shape[0] or tpl.shape[1] > shape[1]):
+                f = min(shape[0] / tpl.shape[0], shape[1] / tpl.shape[1])
+                size = (max(1, int(tpl.shape[1] * f)), max(1, int(tpl.shape[0] * f)))
+                tpl = cv2.resize(tpl, size, interpolation=cv2.INTER_AREA)
+            fitted.append(tpl)
+        _fitted_templates[shape] = fitted
+    return fitted
+
 def is_special_screen(img_rgb, match_threshold=0.8):
     """
     Detect if any of the static templates appear in the current screen
     via normalized cross-correlation template matching.
     """
     gray = cv2.cvtColor(img_rgb, cv2.COLOR_RGB2GRAY)
-    for tpl in TEMPLATES:
+    for tpl in _templates_for(gray.shape):
         if tpl is None:
             continue
         # perform template matching
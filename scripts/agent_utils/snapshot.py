@@ -0,0 +1,122 @@
+# scripts/agent_utils/snapshot.py
+
+import glob
+import logging
+import os
+import pickle
+import threading
+import time
+
+from . import actions
+from . import policy
+from . import reward_memory
+
+# Bump whenever the snapshot layout changes; older snapshots are refused on load
+SNAPSHOT_VERSION = 1
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "data/snapshots")
+SNAPSHOT_KEEP = int(os.getenv("SNAPSHOT_KEEP", "3"))
+
+
+def capture_state(episode, agent_state, hud_analyser):
+    """
+    Collect the complete agent state as shallow copies.
+    Copies are cheap (small dicts/sets) and detach the snapshot from the live
+    containers, so serialization can happen later on another thread.
+    """
+    return {
+        "version": SNAPSHOT_VERSION,
+        "episode": episode,
+        "created": time.time(),
+        "agent": {k: v.copy() for k, v in agent_state.items()},
+        "policy": policy.get_state(),
+        "actions": actions.get_state(),
+        "rewards": reward_memory.get_state(),
+        "hud_analyser": hud_analyser.get_state(),
+    }
+
+
+def restore_state(snapshot, agent_state, hud_analyser):
+    """Restore module and analyser state; agent_state containers are updated in place."""
+    policy.set_state(snapshot["policy"])
+    actions.set_state(snapshot["actions"])
+    reward_memory.set_state(snapshot["rewards"])
+    hud_analyser.set_state(snapshot["hud_analyser"])
+    for key, value in snapshot["agent"].items():
+        agent_state[key].clear()
+        agent_state[key].update(value)
+
+
+def _snapshot_path(directory, episode):
+    return os.path.join(directory, f"snapshot_{episode:06d}.pkl")
+
+
+def write_snapshot(snapshot, directory=SNAPSHOT_DIR, keep=SNAPSHOT_KEEP):
+    """Atomically write a snapshot and prune all but the newest `keep` files."""
+    os.makedirs(directory, exist_ok=True)
+    path = _snapshot_path(directory, snapshot["episode"])
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+    for old in sorted(glob.glob(os.path.join(directory, "snapshot_*.pkl")))[:-keep]:
+        os.remove(old)
+    return path
+
+
+def load_latest_snapshot(directory=SNAPSHOT_DIR):
+    """Return the newest compatible snapshot in directory, or None."""
+    for path in sorted(glob.glob(os.path.join(directory, "snapshot_*.pkl")), reverse=True):
+        try:
+            with open(path, "rb") as f:
+                snapshot = pickle.load(f)
+        except Exception as e:
+            logging.warning("Skipping unreadable snapshot %s: %s", path, e)
+            continue
+        if snapshot.get("version") != SNAPSHOT_VERSION:
+            logging.warning("Skipping snapshot %s with version %s", path, snapshot.get("version"))
+            continue
+        return snapshot
+    return None
+
+
+class Snapshotter:
+    """
+    Writes snapshots on a background thread.
+    submit() only stores a reference to the already-copied state; if the writer
+    is still busy, the pending snapshot is replaced so only the newest is kept.
+    """
+
+    def __init__(self, directory=SNAPSHOT_DIR, keep=SNAPSHOT_KEEP):
+        self.directory = directory
+        self.keep = keep
+        self._pending = None
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="snapshot-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, snapshot):
+        with self._cond:
+            self._pending = snapshot
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                snapshot, self._pending = self._pending, None
+                if snapshot is None:
+                    return
+            try:
+                path = write_snapshot(snapshot, self.directory, self.keep)
+                logging.debug("Wrote snapshot %s", path)
+            except Exception as e:
+                logging.error("Snapshot write failed: %s", e)
+
+    def close(self):
+        """Flush any pending snapshot and stop the writer thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
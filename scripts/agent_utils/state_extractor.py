@@ -3,15 +3,17 @@ import torch
 import numpy as np
 import cv2
 import logging
-from yolov5.utils.augmentations import letterbox
 from yolov5.utils.general import non_max_suppression
 from yolov5.models.common import DetectMultiBackend
 import time
+from .game_state import GameState, CentroidTracker, POS_DTYPE, CONF_DTYPE
 
 # Frame skipping for performance
 _frame_count = 0
 _last_state = None
 SKIP_N_FRAMES = int(os.getenv("SKIP_N_FRAMES", "1"))  # skip this many frames between full detections
+# Keeps object identities across detections
+_tracker = CentroidTracker()
 
 # Default detection thresholds (can be overridden via env vars or function args)
 CONF_THRESH = float(os.getenv("CONF_THRESH", 0.25))
@@ -30,92 +32,220 @@ MODEL_PATH = os.getenv(
 )
 # Allow dynamic device selection via environment
 DEVICE = os.getenv("DEVICE", "cpu")
-model = DetectMultiBackend(MODEL_PATH, device=DEVICE)
+# "yolo" (best.pt) or "tiny" (distilled TinyDetector, see distill.py)
+DETECTOR_BACKEND = os.getenv("DETECTOR_BACKEND", "yolo")
+TINY_MODEL_PATH = os.getenv(
+    "TINY_MODEL_PATH",
+    os.path.join(os.path.dirname(__file__), "../../models/tiny.pt")
+)
+TINY_CONF_THRESH = float(os.getenv("TINY_CONF_THRESH", 0.3))
+# Unix socket of a shared detection server; when set, no model is loaded in this process
+DETECTION_SERVER = os.getenv("DETECTION_SERVER", "")
+model = None
+_tiny = None
+_client = None
 
-def scale_coords(img1_shape, coords, img0_shape, ratio_pad=None):
-    if ratio_pad is None:
-        gain = min(img1_shape[0]/img0_shape[0], img1_shape[1]/img0_shape[1])
-        pad = ((img1_shape[1] - img0_shape[1]*gain)/2,
-               (img1_shape[0] - img0_shape[0]*gain)/2)
-    else:
-        gain, pad = ratio_pad
-    # Shift by padding
-    coords[:, [0,2]] -= pad[0]
-    coords[:, [1,3]] -= pad[1]
-    # Scale using separate width/height gains if gain is a tuple
-    if isinstance(gain, (tuple, list)):
-        gain_x, gain_y = gain
-    else:
-        gain_x = gain_y = gain
-    coords[:, [0,2]] /= gain_x
-    coords[:, [1,3]] /= gain_y
-    # Clamp to image bounds
-    coords[:, :4] = coords[:, :4].clamp(min=0)
-    return coords
+def get_model():
+    """Load the detector on first use."""
+    global model
+    if model is None:
+        model = DetectMultiBackend(MODEL_PATH, device=DEVICE)
+    return model
+
+def get_tiny_backend():
+    """Load the distilled detector on first use."""
+    global _tiny
+    if _tiny is None:
+        from .tiny_detector import TinyBackend
+        _tiny = TinyBackend(TINY_MODEL_PATH, device=DEVICE)
+    return _tiny
+# Detector input size (longest side after letterboxing)
+INPUT_SIZE = 320
+LETTERBOX_COLOR = 114
+
+
+class InputBuffer:
+    """
+    Persistent detector input for one source frame size.
+    Letterbox geometry (same as yolov5's letterbox with auto=True) is computed
+    once; fill() resizes into a reused uint8 buffer and writes the channel-swapped,
+    normalized pixels straight into the interior of a preallocated float tensor
+    whose padding is set up front.
+    """
+
+    def __init__(self, src_shape, new_shape=INPUT_SIZE, stride=32):
+        h, w = src_shape[:2]
+        self.gain = min(new_shape / h, new_shape / w)
+        self.unpad_w, self.unpad_h = int(round(w * self.gain)), int(round(h * self.gain))
+        dw = np.mod(new_shape - self.unpad_w, stride) / 2
+        dh = np.mod(new_shape - self.unpad_h, stride) / 2
+        self.pad = (dw, dh)
+        self.top, self.left = int(round(dh - 0.1)), int(round(dw - 0.1))
+        out_h = self.top + self.unpad_h + int(round(dh + 0.1))
+        out_w = self.left + self.unpad_w + int(round(dw + 0.1))
+        self.resized = None
+        if (w, h) != (self.unpad_w, self.unpad_h):
+            self.resized = np.empty((self.unpad_h, self.unpad_w, 3), dtype=np.uint8)
+        self.tensor = torch.full((1, 3, out_h, out_w), LETTERBOX_COLOR / 255.0, dtype=torch.float32)
+        self.array = self.tensor.numpy()
+        self._batches = {}
+
+    def batch(self, n):
+        """Persistent (n, 3, H, W) input tensor for batched inference."""
+        tensor = self._batches.get(n)
+        if tensor is None:
+            tensor = torch.full((n,) + tuple(self.tensor.shape[1:]), LETTERBOX_COLOR / 255.0, dtype=torch.float32)
+            self._batches[n] = tensor
+        return tensor
+
+    def fill(self, image, out=None):
+        """Write image into out (a (3, H, W) float32 view, default: own tensor)."""
+        src = image
+        if self.resized is not None:
+            cv2.resize(image, (self.unpad_w, self.unpad_h), dst=self.resized, interpolation=cv2.INTER_LINEAR)
+            src = self.resized
+        if out is None:
+            out = self.array[0]
+        rows = slice(self.top, self.top + self.unpad_h)
+        cols = slice(self.left, self.left + self.unpad_w)
+        # reversed channel order, scaled to [0, 1]
+        for c in range(3):
+            np.divide(src[:, :, 2 - c], np.float32(255.0), out=out[c, rows, cols])
+        return out
+
+    def to_image_coords(self, xyxy):
+        """Map letterboxed (n, 4) boxes back to source-frame pixels, in place."""
+        xyxy[:, [0, 2]] -= self.pad[0]
+        xyxy[:, [1, 3]] -= self.pad[1]
+        xyxy /= self.gain
+        np.maximum(xyxy, 0, out=xyxy)
+        return np.round(xyxy, out=xyxy)
+
+
+_input_buffers = {}
+
+def get_input_buffer(shape):
+    """Return the cached InputBuffer for a frame shape, creating it on first use."""
+    key = shape[:2]
+    buf = _input_buffers.get(key)
+    if buf is None:
+        buf = InputBuffer(key, INPUT_SIZE, int(get_model().stride))
+        _input_buffers[key] = buf
+    return buf
 
 def get_game_state(
     image: np.ndarray,
     class_mapping: dict = None,
     conf_thresh: float = CONF_THRESH,
     iou_thresh: float   = IOU_THRESH
-) -> dict:
-    global _frame_count, _last_state
+) -> GameState:
+    global _frame_count, _last_state, _client
     _frame_count += 1
     # If skipping frames and we have a cached state, return it
     if SKIP_N_FRAMES and _frame_count % (SKIP_N_FRAMES + 1) != 0 and _last_state is not None:
         return _last_state
-    # Prepare mapping
-    mapping = class_mapping if class_mapping is not None else DEFAULT_CLASS_MAPPING
-    # Letterbox with returned ratio and padding
-    img, ratio, pad = letterbox(image, new_shape=320)
-    img = img[:, :, ::-1].transpose(2,0,1)
-    img = np.ascontiguousarray(img)
-    tensor = torch.from_numpy(img).to(model.device).float() / 255.0
-    if tensor.ndimension() == 3:
-        tensor = tensor.unsqueeze(0)
-
-    pred = model(tensor)[0]
-    pred = non_max_suppression(
-        pred,
-        conf_thres=conf_thresh,
-        iou_thres=iou_thresh
-    )[0]
-    names = model.names
-
-    # Initialize state collections
-    state = { key+"_pos" if key=="player" else key+"s":
-              None if key=="player" else []
-              for key in mapping }
-    # Temporary holder for player
-    player = None
-    if pred is not None and len(pred):
-        pred[:, :4] = scale_coords(
-            tensor.shape[2:], pred[:, :4], image.shape,
-            ratio_pad=(ratio, pad)
-        ).round()
-        for *xyxy, conf, cls in pred:
-            x = float((xyxy[0]+xyxy[2]) / 2)
-            y = float((xyxy[1]+xyxy[3]) / 2)
-            lbl = names[int(cls)].lower()
-            # Assign detection to the first matching state key
-            for key, labels in mapping.items():
-                if lbl in labels:
-                    if key == "player":
-                        player = (x, y)
-                    else:
-                        state[key+"s"].append((x, y))
-                    break
-
-    # Fill player position and coordinates
-    if player is not None:
-        state["player_pos"] = player
-        state["player_x"], state["player_y"] = player
+    if DETECTION_SERVER:
+        if _client is None:
+            from .detection_server import DetectionClient
+            _client = DetectionClient(DETECTION_SERVER)
+        state = _client.get_game_state(image, class_mapping, conf_thresh, iou_thresh)
     else:
-        state["player_pos"] = None
-        state["player_x"], state["player_y"] = 0, 0
+        state = detect_batch([image], class_mapping, conf_thresh, iou_thresh, [_tracker])[0]
     _last_state = state
     return state
 
+def _infer(images, conf_thresh, iou_thresh):
+    """
+    Run the detector once on same-shaped frames.
+    Returns one (n, 6) xyxy/conf/cls array in frame pixels (or None) per image.
+    """
+    net = get_model()
+    # Letterbox, channel-swap and normalize into the persistent input tensor
+    buf = get_input_buffer(images[0].shape)
+    if len(images) == 1:
+        buf.fill(images[0])
+        tensor = buf.tensor
+    else:
+        tensor = buf.batch(len(images))
+        array = tensor.numpy()
+        for i, image in enumerate(images):
+            buf.fill(image, out=array[i])
+    tensor = tensor.to(net.device, non_blocking=True)
+
+    pred = net(tensor)[0]
+    preds = non_max_suppression(
+        pred,
+        conf_thres=conf_thresh,
+        iou_thres=iou_thresh
+    )
+    dets = []
+    for p in preds:
+        det = None
+        if p is not None and len(p):
+            det = p.cpu().numpy()
+            buf.to_image_coords(det[:, :4])
+        dets.append(det)
+    return dets
+
+def detect_batch(images, class_mapping=None, conf_thresh=CONF_THRESH, iou_thresh=IOU_THRESH, trackers=None,
+                 backend=None):
+    """
+    Detect objects in several frames with one forward pass per frame shape.
+    trackers, if given, holds one CentroidTracker (or None) per image.
+    backend overrides DETECTOR_BACKEND; the tiny backend predicts its own
+    trained classes and ignores class_mapping and the YOLO thresholds.
+    """
+    if (backend or DETECTOR_BACKEND) == "tiny":
+        return get_tiny_backend().detect(images, TINY_CONF_THRESH, trackers)
+    mapping = class_mapping if class_mapping is not None else DEFAULT_CLASS_MAPPING
+    names = get_model().names
+    groups = {}
+    for i, image in enumerate(images):
+        groups.setdefault(image.shape[:2], []).append(i)
+    states = [None] * len(images)
+    for idx in groups.values():
+        dets = _infer([images[i] for i in idx], conf_thresh, iou_thresh)
+        for i, det in zip(idx, dets):
+            tracker = trackers[i] if trackers is not None else None
+            states[i] = build_state(det, names, mapping, tracker)
+    return states
+
+def _class_lookup(names, mapping):
+    """Array mapping model class id -> index of its state key in mapping (-1 if unmapped)."""
+    items = list(names.items() if isinstance(names, dict) else enumerate(names))
+    keys = list(mapping)
+    lookup = np.full(max((int(i) for i, _ in items), default=-1) + 1, -1, dtype=np.int64)
+    for i, name in items:
+        lbl = name.lower()
+        # Assign each label to the first matching state key
+        for k, key in enumerate(keys):
+            if lbl in mapping[key]:
+                lookup[int(i)] = k
+                break
+    return lookup
+
+def build_state(det, names, mapping, tracker=None):
+    """
+    Group (n, 6) xyxy/conf/cls detections in source-frame pixels into a GameState.
+    Rows keep the NMS order, so each class is sorted by descending confidence.
+    """
+    if det is None or not len(det):
+        return GameState.empty(mapping)
+    keys = list(mapping)
+    lookup = _class_lookup(names, mapping)
+    owner = lookup[det[:, 5].astype(np.int64)]
+    centers = np.empty((len(det), 2), dtype=POS_DTYPE)
+    centers[:, 0] = (det[:, 0] + det[:, 2]) / 2
+    centers[:, 1] = (det[:, 1] + det[:, 3]) / 2
+    positions, confidences, track_ids = {}, {}, {}
+    for k, key in enumerate(keys):
+        mask = owner == k
+        positions[key] = centers[mask]
+        confidences[key] = det[mask, 4].astype(CONF_DTYPE)
+        if tracker is not None:
+            track_ids[key] = tracker.assign(key, positions[key])
+    return GameState(positions, confidences, track_ids if tracker is not None else None)
+
 def get_player_movement(capture_fn) -> tuple:
     """
     capture_fn should be a function returning the current screen image (np.ndarray).
@@ -126,7 +256,10 @@ def get_player_movement(capture_fn) -> tuple:
     frame2 = capture_fn()
     state2 = get_game_state(frame2)
 
-    dx = state2["player_x"] - state1["player_x"]
-    dy = state2["player_y"] - state1["player_y"]
+    p1, p2 = state1.player_pos, state2.player_pos
+    if p1 is None or p2 is None:
+        return 0, 0
+    dx = p2[0] - p1[0]
+    dy = p2[1] - p1[1]
     logging.debug("Movement dx=%s, dy=%s", dx, dy)
     return dx, dy
@@ -0,0 +1,167 @@
+# scripts/agent_utils/tiny_detector.py
+
+import cv2
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+from .game_state import GameState, POS_DTYPE, CONF_DTYPE
+
+# Network input (width, height): the NES native resolution
+TINY_INPUT_SIZE = (256, 240)
+# Heatmap cells are STRIDE x STRIDE input pixels
+STRIDE = 4
+MAX_OBJECTS = 16  # per class and frame
+
+
+def _conv(c_in, c_out, stride=1, dilation=1):
+    return nn.Sequential(
+        nn.Conv2d(c_in, c_out, 3, stride=stride, padding=dilation, dilation=dilation, bias=False),
+        nn.BatchNorm2d(c_out),
+        nn.ReLU(inplace=True),
+    )
+
+
+class TinyDetector(nn.Module):
+    """
+    Small CenterNet-style detector for NES sprites.
+    Predicts one center heatmap per class plus a 2-channel sub-cell offset, at
+    1/STRIDE of the input resolution. Sprites are small and the palette is
+    fixed, so a few narrow conv layers are enough to mimic the YOLO teacher.
+    """
+
+    def __init__(self, num_classes, width=32):
+        super().__init__()
+        self.num_classes = num_classes
+        self.backbone = nn.Sequential(
+            _conv(3, width // 2, stride=2),
+            _conv(width // 2, width, stride=2),
+            _conv(width, width),
+            _conv(width, width * 2, dilation=2),
+            _conv(width * 2, width * 2, dilation=4),
+        )
+        self.heatmap = nn.Conv2d(width * 2, num_classes, 1)
+        self.offset = nn.Conv2d(width * 2, 2, 1)
+        # start with a low prior so the focal loss is stable early on
+        nn.init.constant_(self.heatmap.bias, -2.19)
+
+    def forward(self, x):
+        features = self.backbone(x)
+        return self.heatmap(features), self.offset(features)
+
+
+def to_input(images, out=None):
+    """Resize RGB frames to TINY_INPUT_SIZE and stack them as a (B, 3, H, W) float tensor."""
+    w, h = TINY_INPUT_SIZE
+    if out is None:
+        out = torch.empty((len(images), 3, h, w), dtype=torch.float32)
+    array = out.numpy()
+    for i, img in enumerate(images):
+        if img.shape[1] != w or img.shape[0] != h:
+            img = cv2.resize(img, (w, h), interpolation=cv2.INTER_AREA)
+        np.divide(img.transpose(2, 0, 1), np.float32(255.0), out=array[i])
+    return out
+
+
+def encode_targets(labels, classes, sigma=1.0):
+    """
+    Build training targets from teacher labels ({class: (n, 2) centers in
+    TINY_INPUT_SIZE pixels} per frame): Gaussian center heatmaps, offsets and
+    an offset mask at each object's peak cell.
+    """
+    w, h = TINY_INPUT_SIZE
+    gw, gh = w // STRIDE, h // STRIDE
+    heat = np.zeros((len(labels), len(classes), gh, gw), dtype=np.float32)
+    offset = np.zeros((len(labels), 2, gh, gw), dtype=np.float32)
+    mask = np.zeros((len(labels), 1, gh, gw), dtype=np.float32)
+    ys, xs = np.mgrid[0:gh, 0:gw]
+    for i, frame_labels in enumerate(labels):
+        for c, key in enumerate(classes):
+            for x, y in frame_labels.get(key, ()):
+                cx, cy = x / STRIDE, y / STRIDE
+                ix, iy = min(int(cx), gw - 1), min(int(cy), gh - 1)
+                g = np.exp(-((xs - ix) ** 2 + (ys - iy) ** 2) / (2 * sigma ** 2))
+                np.maximum(heat[i, c], g, out=heat[i, c])
+                offset[i, :, iy, ix] = (cx - ix, cy - iy)
+                mask[i, 0, iy, ix] = 1.0
+    return torch.from_numpy(heat), torch.from_numpy(offset), torch.from_numpy(mask)
+
+
+def detection_loss(heat_logits, offset_pred, heat_target, offset_target, mask):
+    """Penalty-reduced focal loss on the heatmaps plus L1 on peak offsets."""
+    pred = torch.sigmoid(heat_logits).clamp(1e-4, 1 - 1e-4)
+    pos = heat_target.eq(1).float()
+    neg = 1.0 - pos
+    pos_loss = torch.log(pred) * (1 - pred) ** 2 * pos
+    neg_loss = torch.log(1 - pred) * pred ** 2 * (1 - heat_target) ** 4 * neg
+    num_pos = pos.sum().clamp(min=1.0)
+    focal = -(pos_loss.sum() + neg_loss.sum()) / num_pos
+    off = (torch.abs(offset_pred - offset_target) * mask).sum() / mask.sum().clamp(min=1.0)
+    return focal + off
+
+
+@torch.no_grad()
+def decode(heat_logits, offset_pred, conf_thresh=0.3, max_objects=MAX_OBJECTS):
+    """
+    Peak-pick heatmaps (3x3 max-pool suppression).
+    Returns per image a list, per class, of (centers (n, 2) in TINY_INPUT_SIZE
+    pixels, scores (n,)).
+    """
+    heat = torch.sigmoid(heat_logits)
+    peaks = heat * (F.max_pool2d(heat, 3, stride=1, padding=1) == heat)
+    b, c, gh, gw = heat.shape
+    scores, idx = peaks.view(b, c, -1).topk(min(max_objects, gh * gw), dim=2)
+    scores, idx = scores.numpy(), idx.numpy()
+    offsets = offset_pred.view(b, 2, -1).numpy()
+    results = []
+    for i in range(b):
+        per_class = []
+        for k in range(c):
+            keep = scores[i, k] >= conf_thresh
+            cells = idx[i, k][keep]
+            cx = (cells % gw + offsets[i, 0, cells]) * STRIDE
+            cy = (cells // gw + offsets[i, 1, cells]) * STRIDE
+            per_class.append((np.stack([cx, cy], axis=1).astype(POS_DTYPE), scores[i, k][keep].astype(CONF_DTYPE)))
+        results.append(per_class)
+    return results
+
+
+class TinyBackend:
+    """Loads an exported TinyDetector checkpoint and turns frames into GameStates."""
+
+    def __init__(self, path, device="cpu"):
+        ckpt = torch.load(path, map_location=device)
+        self.classes = list(ckpt["classes"])
+        self.net = TinyDetector(len(self.classes), ckpt.get("width", 32))
+        self.net.load_state_dict(ckpt["state_dict"])
+        self.net.eval().to(device)
+        self.device = device
+        self._inputs = {}
+
+    def detect(self, images, conf_thresh=0.3, trackers=None):
+        n = len(images)
+        buf = self._inputs.get(n)
+        if buf is None:
+            w, h = TINY_INPUT_SIZE
+            buf = torch.empty((n, 3, h, w), dtype=torch.float32)
+            self._inputs[n] = buf
+        to_input(images, out=buf)
+        with torch.no_grad():
+            heat, off = self.net(buf.to(self.device))
+        decoded = decode(heat.cpu(), off.cpu(), conf_thresh)
+        states = []
+        for i, (img, per_class) in enumerate(zip(images, decoded)):
+            sx = img.shape[1] / TINY_INPUT_SIZE[0]
+            sy = img.shape[0] / TINY_INPUT_SIZE[1]
+            positions, confidences, track_ids = {}, {}, {}
+            for key, (centers, scores) in zip(self.classes, per_class):
+                centers[:, 0] *= sx
+                centers[:, 1] *= sy
+                positions[key] = centers
+                confidences[key] = scores
+                tracker = trackers[i] if trackers is not None else None
+                if tracker is not None:
+                    track_ids[key] = tracker.assign(key, centers)
+            states.append(GameState(positions, confidences, track_ids or None))
+        return states
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+import sys
+import os
+import argparse
+import logging
+
+# 1) Make this scripts/ folder itself a top‐level module
+THIS_DIR = os.path.dirname(__file__)
+if THIS_DIR not in sys.path:
+    sys.path.insert(0, THIS_DIR)
+
+# 2) Make yolov5/ a top‐level module so its own internal imports (from utils.general) resolve
+YOLO_ROOT = os.path.join(THIS_DIR, "yolov5")
+if YOLO_ROOT not in sys.path:
+    sys.path.insert(0, YOLO_ROOT)
+
+from agent_utils import distill
+
+# Argument parser setup
+parser = argparse.ArgumentParser(description="Distill the YOLO detector into a tiny CPU detector")
+sub = parser.add_subparsers(dest="command", required=True)
+
+rec = sub.add_parser("record", help="Record canonical frames from the game window")
+rec.add_argument("--window-title", type=str, default="Nestopia", help="Game window title")
+rec.add_argument("--count",        type=int, default=1000, help="Number of frames to record")
+rec.add_argument("--interval",     type=float, default=0.2, help="Seconds between frames")
+rec.add_argument("--frames-dir",   type=str, default=distill.FRAMES_DIR, help="Output folder for frames")
+
+lab = sub.add_parser("label", help="Auto-label recorded frames with best.pt")
+lab.add_argument("--frames-dir", type=str, default=distill.FRAMES_DIR, help="Folder of recorded frames")
+lab.add_argument("--dataset",    type=str, default=distill.DATASET_PATH, help="Output dataset file")
+
+trn = sub.add_parser("train", help="Train, validate against the teacher and export the tiny detector")
+trn.add_argument("--dataset", type=str, default=distill.DATASET_PATH, help="Labelled dataset file")
+trn.add_argument("--epochs",  type=int, default=30, help="Training epochs")
+trn.add_argument("--width",   type=int, default=32, help="Base channel width of the network")
+trn.add_argument("--output",  type=str, default=distill.TINY_MODEL_PATH, help="Exported checkpoint path")
+args = parser.parse_args()
+
+logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
+
+if __name__ == "__main__":
+    if args.command == "record":
+        from agent_utils.screen_capture import get_window_region
+        region = get_window_region(args.window_title)
+        if region is None:
+            sys.exit("Could not locate the game window.")
+        distill.record_frames(region, args.frames_dir, args.count, args.interval)
+    elif args.command == "label":
+        distill.autolabel(args.frames_dir, args.dataset)
+    else:
+        dataset = distill.load_dataset(args.dataset)
+        model, val_idx = distill.train(dataset, epochs=args.epochs, width=args.width)
+        metrics = distill.validate(model, dataset, val_idx)
+        logging.info("[DISTILL] validation vs teacher: error %.2f px | recall %.2f | precision %.2f",
+                     metrics["mean_error_px"], metrics["recall"], metrics["precision"])
+        logging.info("[DISTILL] latency at batch 1: student %.2f ms | teacher %.2f ms | speedup %.1fx",
+                     metrics["student_ms"], metrics["teacher_ms"], metrics["speedup"])
+        distill.export(model, dataset["classes"], args.output)
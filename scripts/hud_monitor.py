@@ -9,10 +9,27 @@ import re
 import json
 import os
 import logging
+import math
+
+# Calibrated HUD field boxes, keyed by game window name and window size
+HUD_LAYOUT_PATH = os.getenv("HUD_LAYOUT_PATH", "data/hud_layout.json")
+TITLE_BAR_HEIGHT = 30
+UPSCALE = 3.0
+OCR_PAD = 10
+FIELD_GAP = 40  # white pixels between field crops joined for one OCR call (wider than a digit)
+FIELD_MARGIN = 4  # slack around each calibrated field (window points or frame pixels)
+OCR_CONFIG = '--psm 7 -c tessedit_char_whitelist=0123456789'
+SHARPEN_KERNEL = np.array([[-1,-1,-1], [-1,9,-1], [-1,-1,-1]])
 
 class HUDMonitor:
-    def __init__(self, game_window_name="Nestopia"):
+    def __init__(self, game_window_name="Nestopia", layout_path=HUD_LAYOUT_PATH):
         self.game_window_name = game_window_name
+        self.layout_path = layout_path
+        # preprocessing objects are built once and reused for every read
+        self._clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+        self._layouts = self._load_layouts()
+        # window sizes where calibration found no fields; use strip OCR for them
+        self._failed_layouts = set()
 
     def _get_window_bounds(self):
         options = Quartz.kCGWindowListOptionOnScreenOnly
@@ -39,54 +56,239 @@ class HUDMonitor:
             gray = cv2.bitwise_not(gray)
 
         # Apply CLAHE for contrast enhancement
-        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-        enhanced = clahe.apply(gray)
+        enhanced = self._clahe.apply(gray)
 
         # Resize for better OCR
-        scale_factor = 3.0
-        resized = cv2.resize(enhanced, None, fx=scale_factor, fy=scale_factor, interpolation=cv2.INTER_LINEAR)
+        resized = cv2.resize(enhanced, None, fx=UPSCALE, fy=UPSCALE, interpolation=cv2.INTER_LINEAR)
 
         # Blur and sharpen
         blurred = cv2.GaussianBlur(resized, (3, 3), 0)
-        sharpen_kernel = np.array([[-1,-1,-1], [-1,9,-1], [-1,-1,-1]])
-        sharpened = cv2.filter2D(blurred, -1, sharpen_kernel)
+        sharpened = cv2.filter2D(blurred, -1, SHARPEN_KERNEL)
 
         _, thresholded = cv2.threshold(sharpened, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
         return thresholded
 
-    def extract_hud_info(self, debug=False):
-        bounds = self._get_window_bounds()
-        if bounds is None:
-            return None
-
+    def _strip_bboxes(self, bounds):
         x1, y1, x2, y2 = bounds
-        width = x2 - x1
         height = y2 - y1
 
         # Define two horizontal strips: one near top (excluding title bar), one near bottom
         strip_height = max(60, height // 5)  # Increased from 40 and 1/6th of height
 
         # Skip the window title bar by starting 30 pixels below the top
-        top_strip_bbox = (x1, y1 + 30, x2, y1 + 30 + strip_height)
+        top_strip_bbox = (x1, y1 + TITLE_BAR_HEIGHT, x2, y1 + TITLE_BAR_HEIGHT + strip_height)
         bottom_strip_bbox = (x1, y2 - 10 - strip_height, x2, y2 - 10)
+        return top_strip_bbox, bottom_strip_bbox
+
+    def _pad(self, processed):
+        return cv2.copyMakeBorder(processed, OCR_PAD, OCR_PAD, OCR_PAD, OCR_PAD, cv2.BORDER_CONSTANT, value=255)
+
+    def _ocr(self, processed):
+        return pytesseract.image_to_string(self._pad(processed), config=OCR_CONFIG).strip()
+
+    def _layout_key(self, bounds):
+        if bounds is None:
+            return f"{self.game_window_name}:native"
+        x1, y1, x2, y2 = bounds
+        return f"{self.game_window_name}:{x2 - x1}x{y2 - y1}"
+
+    def _load_layouts(self):
+        if not os.path.exists(self.layout_path):
+            return {}
+        try:
+            with open(self.layout_path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning("Ignoring unreadable HUD layout file %s: %s", self.layout_path, e)
+            return {}
+
+    def _save_layouts(self):
+        os.makedirs(os.path.dirname(self.layout_path) or ".", exist_ok=True)
+        with open(self.layout_path, "w") as f:
+            json.dump(self._layouts, f, indent=2)
+
+    def _grab_strips(self, bounds):
+        """Screenshot both HUD strips as (image, origin_x, origin_y, pixels_per_point)."""
+        x1, y1 = bounds[:2]
+        strips = []
+        for bbox in self._strip_bboxes(bounds):
+            img_np = np.array(ImageGrab.grab(bbox=bbox))
+            # grabbed pixels per window point (2.0 on Retina displays)
+            scale = img_np.shape[1] / (bbox[2] - bbox[0])
+            strips.append((img_np, bbox[0] - x1, bbox[1] - y1, scale))
+        return strips
+
+    def _frame_strips(self, frame):
+        """Top and bottom HUD strips of an already captured canonical frame."""
+        strip_height = max(1, frame.shape[0] // 5)
+        bottom = frame.shape[0] - strip_height
+        return [(frame[:strip_height], 0, 0, 1.0), (frame[bottom:], 0, bottom, 1.0)]
+
+    def calibrate(self, debug=False, frame=None):
+        """
+        Locate the numeric HUD fields once for the current window size, or for
+        canonical frames if a frame is given.
+        Runs the full strip OCR with word boxes, keeps the digit words of the
+        strip with the most digits and stores their boxes (window points relative
+        to the window origin, or frame pixels) in the layout file. Returns the
+        boxes, or None if no fields were found.
+        """
+        if frame is not None:
+            key = self._layout_key(None)
+            strips = self._frame_strips(frame)
+        else:
+            bounds = self._get_window_bounds()
+            if bounds is None:
+                return None
+            key = self._layout_key(bounds)
+            strips = self._grab_strips(bounds)
+
+        best_boxes, best_digits = [], 0
+        for img_np, ox, oy, scale in strips:
+            data = pytesseract.image_to_data(
+                self._pad(self._preprocess_image(img_np)), config=OCR_CONFIG,
+                output_type=pytesseract.Output.DICT,
+            )
+            boxes, digits = [], 0
+            for text, left, top, w, h in zip(data["text"], data["left"], data["top"], data["width"], data["height"]):
+                n = sum(c.isdigit() for c in text)
+                if not n:
+                    continue
+                digits += n
+                # padded, upscaled OCR pixels -> strip pixels -> layout units
+                fx = (left - OCR_PAD) / UPSCALE / scale + ox
+                fy = (top - OCR_PAD) / UPSCALE / scale + oy
+                fw = w / UPSCALE / scale
+                fh = h / UPSCALE / scale
+                boxes.append([
+                    max(int(fx) - FIELD_MARGIN, 0), max(int(fy) - FIELD_MARGIN, 0),
+                    math.ceil(fx + fw) + FIELD_MARGIN, math.ceil(fy + fh) + FIELD_MARGIN,
+                ])
+            if digits > best_digits:
+                best_boxes, best_digits = boxes, digits
+
+        if debug:
+            logging.debug("[HUD CALIBRATION] %s -> %s", key, best_boxes)
+        if not best_boxes:
+            self._failed_layouts.add(key)
+            logging.warning("HUD calibration found no numeric fields for %s", key)
+            return None
+        self._failed_layouts.discard(key)
+        self._layouts[key] = best_boxes
+        self._save_layouts()
+        return best_boxes
+
+    def field_count(self, frame=None):
+        """Number of calibrated HUD fields (calibrating first if needed), or None."""
+        bounds = None
+        if frame is None:
+            bounds = self._get_window_bounds()
+            if bounds is None:
+                return None
+        key = self._layout_key(bounds)
+        if key not in self._layouts and key not in self._failed_layouts:
+            self.calibrate(frame=frame)
+        fields = self._layouts.get(key)
+        return len(fields) if fields else None
+
+    def _read_fields(self, fields, bounds=None, frame=None, debug=False):
+        """
+        OCR only the calibrated field boxes: cropped straight from frame if
+        given, otherwise grabbed together in one screenshot of the window.
+        The preprocessed crops are joined side by side with white gaps and
+        read with one tesseract call; words are mapped back to fields by their
+        x-range, so each field yields exactly one token and positions stay fixed.
+        Returns '' if any field reads empty, so the caller falls back to
+        strip OCR instead of shifting the later tokens.
+        """
+        ux1 = min(b[0] for b in fields)
+        uy1 = min(b[1] for b in fields)
+        ux2 = max(b[2] for b in fields)
+        uy2 = max(b[3] for b in fields)
+        if frame is not None:
+            img_np, scale = frame[uy1:uy2, ux1:ux2], 1.0
+        else:
+            x1, y1 = bounds[:2]
+            img_np = np.array(ImageGrab.grab(bbox=(x1 + ux1, y1 + uy1, x1 + ux2, y1 + uy2)))
+            scale = img_np.shape[1] / (ux2 - ux1)
+
+        crops = []
+        for fx1, fy1, fx2, fy2 in fields:
+            crop = img_np[int((fy1 - uy1) * scale):int((fy2 - uy1) * scale),
+                          int((fx1 - ux1) * scale):int((fx2 - ux1) * scale)]
+            if not crop.size:
+                return ''
+            crops.append(self._preprocess_image(crop))
+
+        height = max(c.shape[0] for c in crops)
+        parts, ranges, x = [], [], OCR_PAD
+        for crop in crops:
+            top = (height - crop.shape[0]) // 2
+            parts.append(cv2.copyMakeBorder(crop, top, height - crop.shape[0] - top, 0, FIELD_GAP,
+                                            cv2.BORDER_CONSTANT, value=255))
+            ranges.append((x, x + crop.shape[1]))
+            x += crop.shape[1] + FIELD_GAP
+        data = pytesseract.image_to_data(
+            self._pad(np.hstack(parts)), config=OCR_CONFIG, output_type=pytesseract.Output.DICT,
+        )
+
+        tokens = [''] * len(fields)
+        for text, left, w in zip(data["text"], data["left"], data["width"]):
+            word = ''.join(re.findall(r'\d+', text))
+            if not word:
+                continue
+            center = left + w / 2
+            for i, (x1, x2) in enumerate(ranges):
+                if x1 - FIELD_GAP / 2 <= center < x2 + FIELD_GAP / 2:
+                    tokens[i] += word
+                    break
+        if not all(tokens):
+            if debug:
+                logging.debug("[HUD FIELDS OCR]: empty field in %s", tokens)
+            return ''
+        if debug:
+            logging.debug("[HUD FIELDS OCR]: %s", tokens)
+        return ' '.join(tokens)
+
+    def extract_hud_info(self, debug=False, frame=None):
+        """
+        Read the HUD digits. With a canonical frame (see screen_capture.capture_frame)
+        the fields are cropped from it and no screenshot is taken.
+        """
+        bounds = None
+        if frame is None:
+            bounds = self._get_window_bounds()
+            if bounds is None:
+                return None
+
+        key = self._layout_key(bounds)
+        if key not in self._layouts and key not in self._failed_layouts:
+            self.calibrate(debug=debug, frame=frame)
+        fields = self._layouts.get(key)
+        if fields:
+            text = self._read_fields(fields, bounds=bounds, frame=frame, debug=debug)
+            if text:
+                return {'hud_text': text}
+        if frame is not None:
+            strips = self._frame_strips(frame)
+        else:
+            strips = self._grab_strips(bounds)
+        return self._extract_from_strips([img for img, *_ in strips], debug=debug)
 
-        def ocr_strip(bbox):
-            screenshot = ImageGrab.grab(bbox=bbox)
-            img_np = np.array(screenshot)
-            processed = self._preprocess_image(img_np)
-            padded = cv2.copyMakeBorder(processed, 10, 10, 10, 10, cv2.BORDER_CONSTANT, value=255)
-            ocr_text = pytesseract.image_to_string(padded, config='--psm 7 -c tessedit_char_whitelist=0123456789').strip()
+    def _extract_from_strips(self, strip_images, debug=False):
+        def ocr_strip(img_np):
+            ocr_text = self._ocr(self._preprocess_image(img_np))
             # Fallback: try alternate preprocessing if OCR result is empty
             if not ocr_text:
                 # Fallback: try with just grayscale and threshold
                 gray = cv2.cvtColor(img_np, cv2.COLOR_RGB2GRAY)
                 _, fallback_thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-                fallback_padded = cv2.copyMakeBorder(fallback_thresh, 10, 10, 10, 10, cv2.BORDER_CONSTANT, value=255)
-                ocr_text = pytesseract.image_to_string(fallback_padded, config='--psm 7 -c tessedit_char_whitelist=0123456789').strip()
+                ocr_text = self._ocr(fallback_thresh)
             return ocr_text
 
-        top_text = ocr_strip(top_strip_bbox)
-        bottom_text = ocr_strip(bottom_strip_bbox)
+        top_img, bottom_img = strip_images
+        top_text = ocr_strip(top_img)
+        bottom_text = ocr_strip(bottom_img)
 
         # Determine which strip contains more numeric characters
         def numeric_score(text):
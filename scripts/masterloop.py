@@ -22,10 +22,11 @@ parser = argparse.ArgumentParser(description="Launch RL agent")
 parser.add_argument("--episodes", type=int, default=500, help="Number of training episodes")
 parser.add_argument("--delay",    type=float, default=0.0, help="Delay between actions (seconds)")
 parser.add_argument("--window-title", type=str, default="Nestopia", help="Game window title")
+parser.add_argument("--resume", action="store_true", help="Restore the latest agent snapshot before training")
 args = parser.parse_args()
 
 logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
 
 if __name__ == "__main__":
     #input("[ACTION REQUIRED] Make sure the Nestopia window is visible, then press Enter to start...\n")
-    run_agent(episodes=args.episodes, delay=args.delay, window_title=args.window_title)
+    run_agent(episodes=args.episodes, delay=args.delay, window_title=args.window_title, resume=args.resume)
@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+import sys
+import os
+import argparse
+import logging
+
+# 1) Make this scripts/ folder itself a top‐level module
+THIS_DIR = os.path.dirname(__file__)
+if THIS_DIR not in sys.path:
+    sys.path.insert(0, THIS_DIR)
+
+# 2) Make yolov5/ a top‐level module so its own internal imports (from utils.general) resolve
+YOLO_ROOT = os.path.join(THIS_DIR, "yolov5")
+if YOLO_ROOT not in sys.path:
+    sys.path.insert(0, YOLO_ROOT)
+
+from agent_utils.detection_server import DetectionServer, SOCKET_PATH, MAX_BATCH, MAX_WAIT_MS
+
+# Argument parser setup
+parser = argparse.ArgumentParser(description="Serve the detector to local agents over a Unix socket")
+parser.add_argument("--socket",      type=str,   default=SOCKET_PATH, help="Unix socket path")
+parser.add_argument("--max-batch",   type=int,   default=MAX_BATCH, help="Max frames per forward pass")
+parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS, help="Max wait for a batch to fill (ms)")
+args = parser.parse_args()
+
+logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
+
+if __name__ == "__main__":
+    DetectionServer(args.socket, args.max_batch, args.max_wait_ms).serve_forever()